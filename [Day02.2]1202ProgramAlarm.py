@@ -1,9 +1,21 @@
+from shared.IntcodeSymbolic import evaluate, solve, Polynomial
+
 from typing import List, Optional, Dict
 
 
 def main():
     orig = load()
 
+    # The program's control flow doesn't depend on the noun and verb, so position 0 ends up as a polynomial over
+    # them, which can be solved for the target directly.  Only if that fails, try every combination.
+    memory = evaluate(orig, [1, 2])
+    if memory is not None and isinstance(memory.get(0), Polynomial):
+        print("Value in position 0 = %s" % memory[0])
+        for solution in solve(memory[0], 19690720, {1: range(100), 2: range(100)}):
+            print("[N=%d, V=%d] - Solved for position 0 = 19690720" % (solution[1], solution[2]))
+            print("100 * NOUN + VERB = %d" % ((100 * solution[1]) + solution[2]))
+            return
+
     for noun in range(100):
         for verb in range(100):
             instructions = [x for x in orig]
@@ -10,8 +10,7 @@ def main():
 
 
 def load() -> Computer:
-    with open("input/input05.txt", "r") as f:
-        return Computer.from_string(f.read(), inputs=[1])
+    return Computer.from_file("input/input05.txt", inputs=[1])
 
 
 if __name__ == "__main__":
@@ -1,4 +1,6 @@
 from shared.Intcode import Computer
+from shared.IntcodeLoader import load_program
+from shared.IntcodeSweep import sweep
 from itertools import permutations
 
 from typing import Tuple, List, Optional, Union
@@ -14,30 +16,27 @@ def main():
 
 
 def load() -> List[int]:
-    with open("input/input07.txt", "r") as f:
-        return Computer.parse_registers(f.read())
+    return list(load_program("input/input07.txt"))
 
 
 def find_phase_sequence(registers: List[int], amplifiers: int) -> Tuple[Tuple[int, ...], int]:
     # Python libraries help me cheat in generating permutations :D
-    sequence_scores = {x: None for x in permutations(range(amplifiers))}
-
-    for curr_sequence in sequence_scores.keys():
-        input_val = 0
-        for amp_number in range(amplifiers):
-            comp = Computer(copy_registers(registers), inputs=[curr_sequence[amp_number], input_val])
-            outputs = comp.run()
-            input_val = outputs[0]
-        sequence_scores[curr_sequence] = input_val
-
-    return max([(k, v) for k, v in sequence_scores.items()], key=lambda x: x[1])
-
-
-#
-
-
-def copy_registers(registers: List[int]) -> List[int]:
-    return [x for x in registers]
+    # Each sequence is scored in parallel across a pool of worker processes, with the sequences listed up front so
+    # that they can be shared evenly between the workers
+    sequence_scores = sweep(registers, list(permutations(range(amplifiers))), run_amplifiers)
+
+    return max(sequence_scores, key=lambda x: x[1])
+
+
+def run_amplifiers(program: Computer, sequence: Tuple[int, ...]) -> int:
+    input_val = 0
+    for phase in sequence:
+        # Each amplifier runs a fork of the loaded program, which shares its registers until written to
+        comp = program.fork()
+        comp.inputs = [phase, input_val]
+        outputs = comp.run()
+        input_val = outputs[0]
+    return input_val
 
 
 #
@@ -1,5 +1,9 @@
 from shared.Intcode import Computer
+from shared.IntcodeLoader import load_program
+from shared.IntcodeAsync import AsyncComputer, connect, run_all
+from shared.IntcodeSweep import sweep
 from itertools import permutations
+import asyncio
 
 from typing import Tuple, List, Optional, Union
 
@@ -14,49 +18,33 @@ def main():
 
 
 def load() -> List[int]:
-    with open("input/input07.txt", "r") as f:
-        return Computer.parse_registers(f.read())
+    return list(load_program("input/input07.txt"))
 
 
 def find_phase_sequence(registers: List[int], amplifiers: int) -> Tuple[Tuple[int, ...], int]:
-    sequence_scores = {x: None for x in permutations(range(amplifiers, amplifiers * 2))}
+    # Each sequence is scored in parallel across a pool of worker processes, with the sequences listed up front so
+    # that they can be shared evenly between the workers
+    sequence_scores = sweep(registers, list(permutations(range(amplifiers, amplifiers * 2))), run_feedback_loop)
 
-    for curr_sequence in sequence_scores.keys():
+    return max(sequence_scores, key=lambda x: x[1])
 
-        # Instantiate the computers
-        computers = [Computer(copy_registers(registers), inputs=[curr_sequence[amp_number]])
-                     for amp_number in range(amplifiers)]
 
-        # Track their outputs
-        outputs = {i: [] for i in range(amplifiers)}
+def run_feedback_loop(program: Computer, sequence: Tuple[int, ...]) -> int:
+    return asyncio.run(run_amplifiers(program, sequence))
 
-        # Starting from the first amplifier, feed in the appropriate input and run until producing an output.
-        # Then move to the next amplifier in the loop, feeding that output as the next input.  Continue until
-        # the final amplifier halts, then read the final input value from the last amplifier
-        curr_computer = 0
-        input_val = 0
-        while True:
-            computers[curr_computer].inputs.append(input_val)
-            input_val = computers[curr_computer].run_until_output()
 
-            # Getting a value of None back from Computer.run_until_output() indicates that the program halted
-            if input_val is None:
-                if curr_computer == amplifiers - 1:
-                    break
-            else:
-                outputs[curr_computer].append(input_val)
-            curr_computer = (curr_computer + 1) % amplifiers
+async def run_amplifiers(program: Computer, sequence: Tuple[int, ...]) -> int:
+    # Instantiate the amplifiers, each starting from the loaded program's registers (shared until written to) and
+    # given its phase setting as its first input
+    amplifiers = [AsyncComputer(program.registers.copy(), inputs=[phase]) for phase in sequence]
 
-        sequence_scores[curr_sequence] = outputs[amplifiers - 1][-1]
-
-    return max([(k, v) for k, v in sequence_scores.items()], key=lambda x: x[1])
-
-
-#
-
-
-def copy_registers(registers: List[int]) -> List[int]:
-    return [x for x in registers]
+    # Wire the amplifiers into a loop, each feeding its outputs into the next, with the last feeding back into the
+    # first.  Then start things off by giving the first amplifier an input of 0, and run them all until they halt.
+    # The final output of the last amplifier is the result.
+    connect(*amplifiers, loop_back=True)
+    amplifiers[0].input_queue.put_nowait(0)
+    outputs = await run_all(*amplifiers)
+    return outputs[-1]
 
 
 #
@@ -10,8 +10,7 @@ def main():
 
 
 def load() -> Computer:
-    with open("input/input09.txt", "r") as f:
-        return Computer.from_string(f.read(), inputs=[1])
+    return Computer.from_file("input/input09.txt", inputs=[1])
 
 
 if __name__ == "__main__":
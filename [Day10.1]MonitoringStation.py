@@ -1,5 +1,6 @@
 from __future__ import annotations
 from typing import Dict, Union, Set, Tuple
+from shared.day10 import visibility_counts
 
 
 def main():
@@ -24,46 +25,10 @@ def load() -> Set[Coord]:
     return asteroids
 
 
-def has_los(a1: Coord, a2: Coord, asteroids: Set[Coord]) -> bool:
-    # Handle vertical case special, to avoid division by zero
-    if a1.x == a2.x:
-        step = 1 if a2.y > a1.y else -1
-        for y in range(a1.y + step, a2.y, step):
-            if (a1.x, y) in asteroids:
-                return False
-    else:
-        # Calculate slope and y-intercept of line between the asteroids
-        slope = (a2.y - a1.y) / (a2.x - a1.x)
-        intercept = a1.y - (slope * a1.x)
-
-        # Move along x positions in the line, identifying positions that have integer y values
-        # Test whether those x, y coordinates exist in the asteroid set
-        step = 1 if a2.x > a1.x else -1
-        for x in range(a1.x + step, a2.x, step):
-            # y = mx + b, throwback tuesday
-            y = (slope * x) + intercept
-            rounded = round(y)
-
-            # Account for float error
-            if abs(y - rounded) > 0.000001:
-                continue
-            
-            if (x, rounded) in asteroids:
-                return False
-    return True
-
-
 def get_los_count(asteroids: Set[Coord]) -> Dict[Coord, int]:
-    los_count = {a: 0 for a in asteroids}
-    asteroid_list = list(asteroids)
-
-    # Test the line-of-sight of all asteroid pairs
-    for i, a1 in enumerate(asteroid_list):
-        for a2 in asteroid_list[i+1:]:
-            if has_los(a1, a2, asteroids):
-                los_count[a1] += 1
-                los_count[a2] += 1
-    return los_count
+    # Count the distinct directions to the other asteroids from each asteroid
+    los_count = visibility_counts((a.x, a.y) for a in asteroids)
+    return {Coord(x, y): count for (x, y), count in los_count.items()}
 
 
 class Coord:
@@ -1,10 +1,12 @@
 from __future__ import annotations
-from typing import Dict, Union, Set, Tuple, Optional, List, Iterable
-import math
+from typing import Union, Set, Tuple, Optional, List, Iterable
+from itertools import islice
 import pygame
-import sys
 import time
 
+from shared.day10 import Laser
+from shared.render import TileRenderer, make_sprite, handle_events
+
 
 def main():
     asteroids = load()
@@ -28,46 +30,27 @@ def load() -> Set[Coord]:
     return asteroids
 
 
-def sort_by_angles(source: Coord, asteroids: Set[Coord]) -> Dict[float, List[Coord]]:
-    angle_map = dict()
-    for asteroid in asteroids:
-        if asteroid == source:
-            continue
-        angle = source.angle_to(asteroid)
-        angle = round(angle, 8)
-        if angle in angle_map:
-            angle_map[angle].append(asteroid)
-        else:
-            angle_map[angle] = [asteroid]
-    return {a: sorted(l, key=lambda c: source.distance_to(c)) for a, l in angle_map.items()}
-
-
 def run_laser(source: Coord, until_num_destroyed: int, asteroids: Set[Coord],
               render_speed: Optional[int] = None):
-    # Copy asteroids list
-    angles = sort_by_angles(source, asteroids)
-
-    # Sort the angle map in order of angle, starting vertical and going clockwise
-    angles = sorted(angles.items(), key=lambda a: a[0], reverse=True)
     bounds = Coord(max(asteroids, key=lambda c: c.x).x, max(asteroids, key=lambda c: c.y).y)
 
     destroyed = list()
 
-    screen, scale = build_game_screen(bounds) if render_speed is not None else (None, None)
-
-    # Keep destroying asteroids until quota is met
-    while len(destroyed) < until_num_destroyed and len(destroyed) < len(asteroids) - 1:
-        for angle, asteroid_list in angles:
-            if len(asteroid_list) > 0:
-                destroyed.append(asteroid_list.pop(0))
-                if render_speed is not None:
-                    if render_speed <= 0 or len(destroyed) % render_speed == 0:
-                        render_asteroids(screen, asteroids, destroyed, source, scale,
-                                         pause_for_clicks=render_speed == 0)
-                    if render_speed < 0:
-                        time.sleep(-render_speed / 1000)
-                if len(destroyed) == until_num_destroyed:
-                    break
+    renderer = build_renderer(bounds, asteroids, source) if render_speed is not None else None
+
+    # Destroy asteroids in the order the laser reaches them until quota is met
+    order = Laser(a.as_tuple() for a in asteroids).vaporization_order(source.as_tuple())
+    for x, y in islice(order, until_num_destroyed):
+        destroyed.append(Coord(x, y))
+        if renderer is not None:
+            # Only the asteroids whose state has changed need drawing again
+            if len(destroyed) > 1:
+                renderer.draw_tile(destroyed[-2].as_tuple(), DESTROYED)
+            renderer.draw_tile(destroyed[-1].as_tuple(), TARGET)
+            if render_speed <= 0 or len(destroyed) % render_speed == 0:
+                render_asteroids(renderer, destroyed, source, pause_for_clicks=render_speed == 0)
+            if render_speed < 0:
+                time.sleep(-render_speed / 1000)
 
     return destroyed
 
@@ -97,68 +80,43 @@ def build_game_screen(bounds: Coord, max_width: int = 1920, max_height: int = 10
 #
 
 
-def render_asteroids(screen: pygame.Surface, asteroids: Set[Coord], destroyed: List[Coord], source: Coord,
-                     scale: float, pause_for_clicks: bool):
-    """
-    Renders all asteroids, and draws a laser from the source to the last destroyed asteroid.
-
-    @param screen: The screen surface to draw on
-    @param asteroids: The set of all asteroid coordinates
-    @param destroyed: The set of all destroyed asteroid coordinates
-    @param source: The source coordinates of the laser
-    @param scale: The drawing scale
-    @param pause_for_clicks: Whether or not the game should wait on mouse clicking input before continuing after
-    having rendered the asteroids.
-    """
-    if screen is None:
-        return
-
-    # Wipe the screen
-    screen.fill((0, 0, 0))
-
-    # Get the target asteroid, if any
-    target = destroyed[-1] if len(destroyed) > 0 else None
+# The kinds of tiles asteroids are drawn as
+ASTEROID, SOURCE, TARGET, DESTROYED = range(4)
 
-    # Draw laser
-    if target is not None:
-        pygame.draw.line(screen, (255, 0, 0), render_pos(source, scale), render_pos(target, scale), int(scale / 5))
 
-    # Iterate through all asteroids and render them
+def build_renderer(bounds: Coord, asteroids: Set[Coord], source: Coord) -> TileRenderer:
+    """
+    Creates a renderer with every asteroid drawn, and shows it on the screen.
+    """
+    screen, scale = build_game_screen(bounds)
+    sprites = {
+        ASTEROID: make_sprite(scale, (255, 255, 255), scale / 4),
+        SOURCE: make_sprite(scale, (0, 0, 255), scale / 4),
+        TARGET: make_sprite(scale, (255, 128, 0), scale / 4),
+        DESTROYED: make_sprite(scale, (100, 100, 100), scale / 4)
+    }
+    renderer = TileRenderer(screen, scale, sprites)
     for asteroid in asteroids:
-        if asteroid == source:
-            color = (0, 0, 255)
-        elif asteroid == target:
-            color = (255, 128, 0)
-        elif asteroid in destroyed:
-            color = (100, 100, 100)
-        else:
-            color = (255, 255, 255)
-        pygame.draw.rect(screen, color, render_rect(asteroid, scale, scale / 4))
-    pygame.display.flip()
-
-    pause_rendering = True
-    while pause_rendering:
-        for event in pygame.event.get():
-            # End program if window is closed
-            if event.type == pygame.QUIT:
-                sys.exit()
-            # Unpause on click, if pausing for clicks
-            elif event.type == pygame.MOUSEBUTTONDOWN:
-                pause_rendering = False
-        # If not pausing on clicks, just continue
-        if not pause_for_clicks:
-            pause_rendering = False
-
-#
+        renderer.draw_tile(asteroid.as_tuple(), SOURCE if asteroid == source else ASTEROID)
+    renderer.redraw()
+    return renderer
 
 
-def render_pos(coord: Coord, scale: float) -> Tuple[int, int]:
-    return int(coord.x * scale), int(coord.y * scale)
-
+def render_asteroids(renderer: TileRenderer, destroyed: List[Coord], source: Coord, pause_for_clicks: bool):
+    """
+    Draws a laser from the source to the last destroyed asteroid, and updates the parts of the screen that have
+    changed since the last render.
 
-def render_rect(coord: Coord, scale: float, square_scale: float) -> pygame.Rect:
-    center = render_pos(coord, scale)
-    return pygame.Rect(center[0] - int(square_scale / 2), center[1] - int(square_scale / 2), square_scale, square_scale)
+    @param renderer: The renderer the asteroids have been drawn with
+    @param destroyed: The list of all destroyed asteroid coordinates
+    @param source: The source coordinates of the laser
+    @param pause_for_clicks: Whether or not the game should wait on mouse clicking input before continuing after
+    having rendered the asteroids.
+    """
+    if len(destroyed) > 0:
+        renderer.draw_line(source.as_tuple(), destroyed[-1].as_tuple(), (255, 0, 0), int(renderer.scale / 5))
+    renderer.update()
+    handle_events(pause_for_clicks)
 
 
 #
@@ -184,17 +142,14 @@ class Coord:
     def __str__(self):
         return "(%d, %d)" % (self.x, self.y)
 
+    def as_tuple(self) -> Tuple[int, int]:
+        return self.x, self.y
+
     def __add__(self, other: Union[Coord, Tuple[int, int]]):
         if type(other) == tuple:
             return Coord(self.x + other[0], self.y + other[1])
         return Coord(self.x + other.x, self.y + other.y)
 
-    def angle_to(self, other: Coord) -> float:
-        return math.atan2(other.x - self.x, other.y - self.y)
-
-    def distance_to(self, other: Coord) -> float:
-        return (((self.x - other.x) ** 2) + ((self.y - other.y) ** 2)) ** 0.5
-
 
 #
 
@@ -12,8 +12,7 @@ def main():
 
 
 def load() -> Computer:
-    with open("input/input11.txt", "r") as f:
-        return Computer.from_string(f.read())
+    return Computer.from_file("input/input11.txt")
 
 
 def run_painting(computer: Computer, start_color: int) -> Dict[Tuple[int, int], int]:
@@ -20,8 +20,7 @@ def main():
 
 
 def load() -> Computer:
-    with open("input/input13.txt", "r") as f:
-        return Computer.from_string(f.read())
+    return Computer.from_file("input/input13.txt")
 
 
 #
@@ -29,11 +28,10 @@ def load() -> Computer:
 
 def draw_game_screen(computer: Computer) -> Dict[Tuple[int, int], int]:
     screen = dict()
-    while True:
-        outputs = computer.run_until_outputs(3)
-        if outputs is None:
-            break
-        screen[(outputs[0], outputs[1])] = outputs[2]
+    outputs = computer.iter_outputs()
+    # Outputs are streamed in triples of x, y and tile
+    for x, y, tile in zip(outputs, outputs, outputs):
+        screen[(x, y)] = tile
     return screen
 
 #
@@ -1,10 +1,10 @@
 from shared.Intcode import Computer
+from shared.day13 import Arcade, Recording, replay, find_tile_registers, BALL, PADDLE
+from shared.render import TileRenderer, make_sprite, handle_events
 
 import pygame
-import sys
 import time
-import random
-from typing import List, Tuple, Dict, Optional, Union
+from typing import List, Tuple, Dict, Optional, Union, Callable, Hashable
 
 
 def main():
@@ -22,15 +22,15 @@ def main():
 
 
 def load() -> Computer:
-    with open("input/input13.txt", "r") as f:
-        return Computer.from_string(f.read())
+    return Computer.from_file("input/input13.txt")
 
 
 #
 
 
 def play_game(computer: Computer, bounds: Tuple[int, int], render_speed: Optional[int] = None,
-              max_screen_size: Tuple[int, int] = (1920, 1080)) \
+              max_screen_size: Tuple[int, int] = (1920, 1080), recording: Optional[Recording] = None,
+              joystick: Optional[Callable[[Arcade], int]] = None) \
         -> Tuple[Dict[Tuple[int, int], int], int]:
     """
     Plays the game.
@@ -46,67 +46,88 @@ def play_game(computer: Computer, bounds: Tuple[int, int], render_speed: Optiona
     @param max_screen_size: Tuple of the maximum width and height of the render screen.  Guarantees that at
     either the width or the height will exactly match its corresponding maximum, and the other dimension will
     be less than or equal to its corresponding maximum
+    @param recording: If given, the game's inputs are recorded into it, along with its state at regular intervals,
+    so that it can be replayed from any frame with replay_game()
+    @param joystick: Gives the joystick input at each frame.  Defaults to the paddle chasing the ball (see ai()).
     """
+    arcade = Arcade(computer, joystick=joystick if joystick is not None else ai(computer), recording=recording)
+    if render_speed is not None:
+        attach_renderer(arcade, bounds, render_speed, max_screen_size)
+    arcade.run()
+    return arcade.screen_info(), arcade.score
 
-    screen, scale = build_game_screen(bounds, max_width=max_screen_size[0], max_height=max_screen_size[1]) \
-        if render_speed is not None else (None, 1)
 
-    # Set a function to call whenever input is required to give joystick inputs
-    computer.input_method = ai
+def replay_game(recording: Recording, frame: int, bounds: Tuple[int, int], render_speed: int,
+                max_screen_size: Tuple[int, int] = (1920, 1080)) -> int:
+    """
+    Renders a recorded game from the given frame onwards, having seeked to that frame without rendering.  Returns the
+    final score.
+
+    @param recording: The recording of the game, made by play_game()
+    @param frame: The frame to start rendering from
+    (See play_game() for the other parameters)
+    """
+    arcade = replay(recording, frame)
+    attach_renderer(arcade, bounds, render_speed, max_screen_size)
+    arcade.on_screen(arcade)
+    return arcade.run()
 
-    screen_info = dict()
-    score = 0
-    initial_render_complete = False
+
+def attach_renderer(arcade: Arcade, bounds: Tuple[int, int], render_speed: int, max_screen_size: Tuple[int, int]):
+    """
+    Renders the game as the arcade plays it, following the rules set by the render speed (see play_game()).
+    """
+    screen, scale = build_game_screen(bounds, max_width=max_screen_size[0], max_height=max_screen_size[1])
+    renderer = TileRenderer(screen, scale, build_sprites(scale))
     steps = 0
-    while True:
+
+    def on_screen(_: Arcade):
+        # Once the entire initial grid has been drawn (or restored), render all of it
+        for y in range(arcade.height):
+            for x in range(arcade.width):
+                render(renderer, (x, y), arcade.tile_at(x, y))
+        renderer.redraw()
+        handle_events(pause_for_clicks=False)
+
+    def on_tile(_: Arcade, x: int, y: int, tile: int):
+        nonlocal steps
         steps += 1
-        # Get set of outputs
-        outputs = computer.run_until_outputs(3)
-        # If program halted, quit
-        if outputs is None:
-            break
-
-        # Check if this is a score output
-        if outputs[0] == -1 and outputs[1] == 0:
-            score = outputs[2]
-            print(score)
+        # Every tile is drawn as it changes, but the display is only updated once a tile has been drawn (rather than
+        # erased)
+        render(renderer, (x, y), tile)
+        if tile != 0 and (render_speed <= 0 or render_speed <= steps):
+            renderer.update()
+            handle_events(pause_for_clicks=render_speed == 0)
+            steps = 0
+
+            # If the render speed is less than zero, pause the program for an amount of
+            # milliseconds = the absolute value of that render speed
+            if render_speed < 0:
+                time.sleep(-render_speed / 1000)
+
+    arcade.on_screen = on_screen
+    arcade.on_tile = on_tile
+
+
+def ai(computer: Computer) -> Callable[[Arcade], int]:
+    watches = []
+
+    def joystick(arcade: Arcade) -> int:
+        # Find where the game keeps the positions of the ball and paddle, and keep track of them as they're written
+        if len(watches) == 0:
+            registers = find_tile_registers(computer, positions={BALL: arcade.ball_x, PADDLE: arcade.paddle_x})
+            watches.extend([computer.watch(registers[PADDLE]), computer.watch(registers[BALL])])
+        player, ball = watches
+
+        # Give input that would move the player paddle towards the ball
+        if player.value < ball.value:
+            return 1
+        elif player.value > ball.value:
+            return -1
         else:
-            # Otherwise treat it as rendering output
-            screen_info[(outputs[0], outputs[1])] = outputs[2]
-
-            # When the last wall square is done, the entire initial grid has been rendered
-            if (outputs[0], outputs[1]) == bounds:
-                initial_render_complete = True
-                if render_speed is not None:
-                    render(screen, screen_info, None, scale, False)
-
-            # If we're rendering to screen, wait until initial render is complete, and then follow rules set by
-            # the render speed
-            if render_speed is not None and initial_render_complete:
-                if outputs[2] == 0:
-                    render(screen, screen_info, (outputs[0], outputs[1]), scale, pause_for_clicks=False, flip=False)
-                elif render_speed <= 0 or render_speed <= steps:
-                    render(screen, screen_info, (outputs[0], outputs[1]), scale,
-                           pause_for_clicks=render_speed == 0 and initial_render_complete)
-                    steps = 0
-
-                    # If the render speed is less than zero, pause the program for an amount of
-                    # milliseconds = the absolute value of that render speed
-                    if render_speed < 0:
-                        time.sleep(-render_speed / 1000)
-    return screen_info, score
-
-
-def ai(computer: Computer):
-    # Give input that would move the player paddle towards the ball
-    player_x = computer.registers[392]
-    ball_x = computer.registers[388]
-    if player_x < ball_x:
-        return 1
-    elif player_x > ball_x:
-        return -1
-    else:
-        return 0
+            return 0
+
+    return joystick
 
 
 #
@@ -133,78 +154,36 @@ def build_game_screen(bounds: Tuple[int, int], max_width: int = 1920, max_height
 #
 
 
-def render(screen: pygame.Surface, screen_info: Dict[Tuple[int, int], int],
-           pos: Optional[Tuple[int, int]],
-           scale: float, pause_for_clicks: bool,
-           flip: bool = True):
-    """
-    Renders all asteroids, and draws a laser from the source to the last destroyed asteroid.
-
-    @param screen: The screen surface to draw on
-    @param screen_info Information about what to render onto the screen
-    @param pos: The specific coordinates to render, rather than render the whole screen.  If given None, renders
-    the whole screen.
-    @param scale: The drawing scale
-    @param pause_for_clicks: Whether or not the game should wait on mouse clicking input before continuing after
-    having rendered the asteroids.
-    @param flip Whether or not to flip after rendering.  Will not pause if not flipping
-    """
-    if screen is None:
-        return
-
-    block_colors = [(255, 128, 0), (0, 255, 0), (0, 255, 255), (255, 255, 0), (0, 128, 255), (0, 0, 255)]
-
-    items = [(pos, screen_info[pos])] if pos is not None else screen_info.items()
-
-    # Iterate through all asteroids and render them
-    for pos, tile in items:
-        width = 0
-        block_scale = scale
-        if tile == 0:
-            color = (0, 0, 0)
-        elif tile == 1:
-            color = (255, 255, 255)
-        elif tile == 2:
-            color = random.choice(block_colors)
-            block_scale *= 0.9
-        elif tile == 3:
-            color = (255, 50, 50)
-        elif tile == 4:
-            color = (255, 255, 255)
-            block_scale *= 0.6
-            width = 2
-        else:
-            raise Exception("Invalid tile")
-        pygame.draw.rect(screen, color, render_rect(pos, scale, block_scale), width)
-
-    if flip:
-        pygame.display.flip()
-
-        pause_rendering = True
-        while pause_rendering:
-            for event in pygame.event.get():
-                # End program if window is closed
-                if event.type == pygame.QUIT:
-                    sys.exit()
-                # Unpause on click, if pausing for clicks
-                elif event.type == pygame.MOUSEBUTTONDOWN:
-                    pause_rendering = False
-            # If not pausing on clicks, just continue
-            if not pause_for_clicks:
-                pause_rendering = False
-    return
+# The colors blocks may be drawn in
+BLOCK_COLORS = [(255, 128, 0), (0, 255, 0), (0, 255, 255), (255, 255, 0), (0, 128, 255), (0, 0, 255)]
 
 
-#
+def build_sprites(scale: float) -> Dict[Hashable, pygame.Surface]:
+    sprites = {
+        0: make_sprite(scale, (0, 0, 0), scale),
+        1: make_sprite(scale, (255, 255, 255), scale),
+        3: make_sprite(scale, (255, 50, 50), scale),
+        4: make_sprite(scale, (255, 255, 255), scale * 0.6, width=2)
+    }
+    for i, color in enumerate(BLOCK_COLORS):
+        sprites[(2, i)] = make_sprite(scale, color, scale * 0.9)
+    return sprites
 
 
-def render_pos(coord: Tuple[int, int], scale: float) -> Tuple[int, int]:
-    return int(coord[0] * scale), int(coord[1] * scale)
-
+def render(renderer: TileRenderer, pos: Tuple[int, int], tile: int):
+    """
+    Draws a tile, to be shown at the renderer's next update.  Each block keeps the same color, picked by its position.
 
-def render_rect(coord: Tuple[int, int], scale: float, square_scale: float) -> pygame.Rect:
-    center = render_pos(coord, scale)
-    return pygame.Rect(center[0] - int(square_scale / 2), center[1] - int(square_scale / 2), square_scale, square_scale)
+    @param renderer: The renderer to draw with
+    @param pos: The coordinates of the tile
+    @param tile: The tile to draw
+    """
+    if tile == 2:
+        renderer.draw_tile(pos, (2, hash(pos) % len(BLOCK_COLORS)))
+    elif tile in renderer.sprites:
+        renderer.draw_tile(pos, tile)
+    else:
+        raise Exception("Invalid tile")
 
 
 #
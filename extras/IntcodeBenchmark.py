@@ -0,0 +1,275 @@
+from shared.Intcode import Computer, Memory
+from shared.IntcodeLoader import load_program
+from shared.day13 import Arcade, Planner
+from itertools import permutations, product
+from typing import List, Optional, Dict, Tuple, Callable
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+
+
+# The Computer methods used to run programs in each execution mode, as (run, run_until_output)
+MODES = {
+    "interpreted": (Computer.run, Computer.run_until_output),
+    "fast": (Computer.run_fast, Computer.run_until_output_fast),
+    "compiled": (Computer.run_compiled, Computer.run_until_output_compiled)
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks every Intcode workload in each execution mode.")
+    parser.add_argument("--modes", nargs="+", choices=list(MODES), default=list(MODES))
+    parser.add_argument("--workloads", nargs="+", choices=list(WORKLOADS), default=list(WORKLOADS))
+    parser.add_argument("--repeat", type=int, default=3, help="Runs of each workload, of which the fastest is kept")
+    parser.add_argument("--output", default="benchmark.json", help="File to write the results to, as JSON")
+    parser.add_argument("--baseline", help="Results file from a previous run to compare against")
+    parser.add_argument("--threshold", type=float, default=0.1,
+                        help="Fraction by which a workload may be slower than the baseline before it is a regression")
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.workloads, args.modes, args.repeat)
+    print_results(results)
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print("Results written to %s" % args.output)
+
+    if args.baseline is not None:
+        with open(args.baseline, "r") as f:
+            baseline = json.load(f)
+        problems = compare(results, baseline, args.threshold)
+        for problem in problems:
+            print(problem)
+        if len(problems) > 0:
+            sys.exit(1)
+        print("No regressions against %s (threshold %.0f%%)." % (args.baseline, args.threshold * 100))
+
+
+#
+
+
+class Session:
+    """
+    A single run of a workload, creating its computers and running them in a particular execution mode.
+    """
+
+    def __init__(self, mode: str, profile: bool = False):
+        self.run, self.run_until_output = MODES[mode]
+        self.profile = profile
+        self.computers: List[Computer] = []
+
+    def computer(self, registers: Memory, inputs: Optional[List[int]] = None) -> Computer:
+        """
+        Creates a computer running a copy of the given registers.
+        """
+        computer = Computer(registers.copy(), inputs=inputs)
+        if self.profile:
+            computer.enable_profiling()
+            self.computers.append(computer)
+        return computer
+
+    def run_until_outputs(self, computer: Computer, count: int) -> Optional[List[int]]:
+        values = []
+        for i in range(count):
+            o = self.run_until_output(computer)
+            if o is None:
+                return None
+            values.append(o)
+        return values
+
+
+def run_benchmarks(workloads: List[str], modes: List[str], repeat: int) -> Dict:
+    results = []
+    for name in workloads:
+        workload, filename = WORKLOADS[name]
+        registers = Memory(load_program("../input/%s" % filename))
+
+        # The instructions executed don't depend on the mode, so count them once, with profiling
+        session = Session("interpreted", profile=True)
+        expected = workload(session, registers)
+        instructions = sum(c.profile.instructions for c in session.computers)
+
+        for mode in modes:
+            wall_time = None
+            result = None
+            for i in range(repeat):
+                start = time.perf_counter()
+                result = workload(Session(mode), registers)
+                elapsed = time.perf_counter() - start
+                wall_time = elapsed if wall_time is None else min(wall_time, elapsed)
+
+            # Measure memory separately, since tracing allocations slows everything down
+            tracemalloc.start()
+            workload(Session(mode), registers)
+            _, peak_memory = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            results.append({
+                "workload": name,
+                "mode": mode,
+                "result": result,
+                "correct": result == expected,
+                "instructions": instructions,
+                "wall_time": wall_time,
+                "instructions_per_second": instructions / wall_time if wall_time > 0 else 0.0,
+                "peak_memory": peak_memory
+            })
+
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "repeat": repeat,
+        "results": results
+    }
+
+
+def print_results(results: Dict):
+    print("%-14s %-12s %12s %10s %14s %12s" % ("Workload", "Mode", "Instructions", "Time (s)", "Instructions/s",
+                                              "Peak memory"))
+    for r in results["results"]:
+        print("%-14s %-12s %12d %10.3f %14.0f %11.1fK%s" % (r["workload"], r["mode"], r["instructions"], r["wall_time"],
+                                                           r["instructions_per_second"], r["peak_memory"] / 1024,
+                                                           "" if r["correct"] else "  WRONG RESULT"))
+
+
+def compare(results: Dict, baseline: Dict, threshold: float) -> List[str]:
+    """
+    Compares results against a baseline, returning a description of each regression found.
+    """
+    previous = {(r["workload"], r["mode"]): r for r in baseline["results"]}
+    problems = []
+    for r in results["results"]:
+        key = (r["workload"], r["mode"])
+        if not r["correct"]:
+            problems.append("%s (%s): result %r differs from the interpreter's" % (key[0], key[1], r["result"]))
+        if key not in previous:
+            continue
+        old = previous[key]
+        if r["result"] != old["result"]:
+            problems.append("%s (%s): result %r differs from baseline %r" % (key[0], key[1], r["result"],
+                                                                             old["result"]))
+        if r["wall_time"] > old["wall_time"] * (1 + threshold):
+            problems.append("%s (%s): %.3fs is %.0f%% slower than baseline %.3fs" %
+                            (key[0], key[1], r["wall_time"], (r["wall_time"] / old["wall_time"] - 1) * 100,
+                             old["wall_time"]))
+    return problems
+
+
+#
+
+
+def noun_verb_sweep(session: Session, registers: Memory) -> Optional[int]:
+    for noun, verb in product(range(100), range(100)):
+        computer = session.computer(registers)
+        computer.registers[1] = noun
+        computer.registers[2] = verb
+        session.run(computer)
+        if computer.registers[0] == 19690720:
+            return 100 * noun + verb
+    return None
+
+
+def diagnostics(session: Session, registers: Memory) -> List[int]:
+    return [list(session.run(session.computer(registers, inputs=[system_id])))[-1] for system_id in (1, 5)]
+
+
+def amplifiers(session: Session, registers: Memory) -> int:
+    best = None
+    for sequence in permutations(range(5)):
+        val = 0
+        for phase in sequence:
+            val = session.run_until_output(session.computer(registers, inputs=[phase, val]))
+        best = val if best is None else max(best, val)
+    return best
+
+
+def feedback_loop(session: Session, registers: Memory) -> int:
+    best = None
+    for sequence in permutations(range(5, 10)):
+        amps = [session.computer(registers, inputs=[phase]) for phase in sequence]
+        val = 0
+        running = True
+        while running:
+            for amp in amps:
+                amp.inputs.append(val)
+                out = session.run_until_output(amp)
+                if out is None:
+                    running = False
+                    break
+                val = out
+        best = val if best is None else max(best, val)
+    return best
+
+
+def boost(session: Session, registers: Memory) -> List[int]:
+    return list(session.run(session.computer(registers, inputs=[2])))
+
+
+def painting(session: Session, registers: Memory) -> int:
+    computer = session.computer(registers, inputs=[0])
+    directions = [(0, -1), (1, 0), (0, 1), (-1, 0)]
+    direction = 0
+    coord = (0, 0)
+    surface = dict()
+    while True:
+        outputs = session.run_until_outputs(computer, 2)
+        if outputs is None:
+            break
+        surface[coord] = outputs[0]
+        direction = (direction + (1 if outputs[1] == 1 else -1)) % 4
+        coord = (coord[0] + directions[direction][0], coord[1] + directions[direction][1])
+        computer.inputs.append(surface.get(coord, 0))
+    return len(surface)
+
+
+def arcade(session: Session, registers: Memory) -> int:
+    computer = session.computer(registers)
+    # Insert quarters, and steer the paddle towards the ball
+    computer.registers[0] = 2
+    computer.input_method = _joystick
+    score = 0
+    while True:
+        outputs = session.run_until_outputs(computer, 3)
+        if outputs is None:
+            break
+        if outputs[0] == -1 and outputs[1] == 0:
+            score = outputs[2]
+    return score
+
+
+def headless_arcade(session: Session, registers: Memory) -> int:
+    computer = session.computer(registers)
+    computer.registers[0] = 2
+    return Arcade(computer).run(session.run)
+
+
+def planned_arcade(session: Session, registers: Memory) -> int:
+    computer = session.computer(registers)
+    computer.registers[0] = 2
+    return Arcade(computer, joystick=Planner()).run(session.run)
+
+
+def _joystick(computer: Computer) -> int:
+    paddle, ball = computer.registers[392], computer.registers[388]
+    return 1 if paddle < ball else -1 if paddle > ball else 0
+
+
+# Each workload, with the input file holding its program
+WORKLOADS: Dict[str, Tuple[Callable[[Session, Memory], object], str]] = {
+    "day02-sweep": (noun_verb_sweep, "input02.txt"),
+    "day05": (diagnostics, "input05.txt"),
+    "day07-serial": (amplifiers, "input07.txt"),
+    "day07-feedback": (feedback_loop, "input07.txt"),
+    "day09-boost": (boost, "input09.txt"),
+    "day11-painting": (painting, "input11.txt"),
+    "day13-arcade": (arcade, "input13.txt"),
+    "day13-headless": (headless_arcade, "input13.txt"),
+    "day13-planner": (planned_arcade, "input13.txt")
+}
+
+
+if __name__ == "__main__":
+    main()
@@ -12,8 +12,7 @@ def main():
 
 
 def load() -> Computer:
-    with open("../input/input02.txt", "r") as f:
-        return Computer.from_string(f.read())
+    return Computer.from_file("../input/input02.txt")
 
 
 def replace(computer: Computer, replacements: Dict[int, int]):
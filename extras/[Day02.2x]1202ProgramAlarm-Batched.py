@@ -0,0 +1,30 @@
+from shared.IntcodeBatch import BatchComputer
+
+import numpy as np
+
+
+def main():
+    # Run every noun/verb combination at once, one per lane
+    nouns, verbs = np.divmod(np.arange(100 * 100), 100)
+    computer = load(lanes=len(nouns))
+    computer.set_register(1, nouns)
+    computer.set_register(2, verbs)
+    computer.run()
+
+    for lane, error in sorted(computer.errors.items()):
+        print("[N=%d, V=%d] - Program halted with CRASH status.  %s" % (nouns[lane], verbs[lane], error))
+
+    for lane in np.flatnonzero(computer.registers[:, 0] == 19690720):
+        if lane not in computer.errors:
+            print("[N=%d, V=%d] - Program halted with HALT status.  Value in position 0 = %d" %
+                  (nouns[lane], verbs[lane], computer.registers[lane, 0]))
+            print("100 * NOUN + VERB = %d" % ((100 * nouns[lane]) + verbs[lane]))
+            return
+
+
+def load(lanes: int) -> BatchComputer:
+    return BatchComputer.from_file("../input/input02.txt", lanes=lanes)
+
+
+if __name__ == "__main__":
+    main()
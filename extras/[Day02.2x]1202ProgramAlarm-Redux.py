@@ -1,28 +1,48 @@
 from shared.Intcode import Computer
-from typing import List, Optional, Dict
+from shared.IntcodeSweep import sweep
+from shared.IntcodeSymbolic import evaluate, solve, Polynomial
+from itertools import product
+from typing import List, Optional, Dict, Tuple
 
 
 def main():
     computer = load()
-    orig = computer.registers
 
-    for noun in range(100):
-        for verb in range(100):
-            computer.pos = 0
-            computer.registers = [x for x in orig]
-            replace(computer, {1: noun, 2: verb})
-            result = run_program(computer)
+    # Where the program's control flow doesn't depend on the noun and verb, solve for them directly
+    matches = solve_symbolically(computer)
 
-            print("[N=%d, V=%d] - Program halted with %s status.  Value in position 0 = %d" %
-                  (noun, verb, "HALT" if result else "CRASH", computer.registers[0]))
-            if computer.registers[0] == 19690720:
-                print("100 * NOUN + VERB = %d" % ((100 * noun) + verb))
-                return
+    # Otherwise try every noun/verb pair in parallel across a pool of worker processes, stopping at the first match
+    if matches is None:
+        matches = sweep(list(computer.registers), product(range(100), range(100)), run_with_inputs,
+                        predicate=is_target, first_match_only=True)
+
+    for (noun, verb), result in matches:
+        print("[N=%d, V=%d] - Program halted with HALT status.  Value in position 0 = %d" % (noun, verb, result))
+        print("100 * NOUN + VERB = %d" % ((100 * noun) + verb))
 
 
 def load() -> Computer:
-    with open("../input/input02.txt", "r") as f:
-        return Computer.from_string(f.read())
+    return Computer.from_file("../input/input02.txt")
+
+
+def solve_symbolically(computer: Computer) -> Optional[List[Tuple[Tuple[int, int], int]]]:
+    """
+    Runs the program with its noun and verb as symbols, giving the value in position 0 as a polynomial over them,
+    and solves that for the target value.  Returns the first solution in the same form as the sweep, or None if the
+    program can't be evaluated symbolically.
+    """
+    memory = evaluate(list(computer.registers), [1, 2])
+    if memory is None or not isinstance(memory.get(0), (Polynomial, int)):
+        return None
+    result = memory[0] if isinstance(memory[0], Polynomial) else Polynomial.constant(memory[0])
+    print("Value in position 0 = %s" % result)
+    for solution in solve(result, 19690720, {1: range(100), 2: range(100)}):
+        noun, verb = solution[1], solution[2]
+        # Confirm the solution by running the program for real
+        value = run_with_inputs(computer.fork(), (noun, verb))
+        if is_target(value):
+            return [((noun, verb), value)]
+    return []
 
 
 def replace(computer: Computer, replacements: Dict[int, int]):
@@ -39,5 +59,17 @@ def run_program(computer: Computer) -> bool:
         return False
 
 
+def run_with_inputs(computer: Computer, inputs: Tuple[int, int]) -> Optional[int]:
+    """
+    Runs the program with the given noun and verb, returning the value in position 0 if it halts successfully.
+    """
+    replace(computer, {1: inputs[0], 2: inputs[1]})
+    return computer.registers[0] if run_program(computer) else None
+
+
+def is_target(result: Optional[int]) -> bool:
+    return result == 19690720
+
+
 if __name__ == "__main__":
     main()
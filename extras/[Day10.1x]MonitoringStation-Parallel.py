@@ -0,0 +1,27 @@
+from shared.day10search import best_stations
+
+from typing import List, Tuple
+import argparse
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Finds the best monitoring stations on an asteroid map.")
+    parser.add_argument("map", nargs="?", default="../input/input10.txt", help="File holding the asteroid map")
+    parser.add_argument("--top", type=int, default=1, help="Number of stations to list")
+    parser.add_argument("--workers", type=int, help="Worker processes to search with, defaulting to the CPU count")
+    args = parser.parse_args()
+
+    asteroids = load(args.map)
+
+    for coord, count in best_stations(asteroids, k=args.top, workers=args.workers):
+        print("The asteroid at position (%d, %d) has %d visible asteroids." % (coord[0], coord[1], count))
+
+
+def load(path: str) -> List[Tuple[int, int]]:
+    with open(path, "r") as f:
+        grid = f.readlines()
+    return [(c, r) for r, row in enumerate(grid) for c, col in enumerate(row.strip()) if col == "#"]
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,13 @@
 from __future__ import annotations
 
-from typing import Tuple, List, Iterable, Optional, Dict, Union, Callable
+from typing import Tuple, List, Iterable, Iterator, Optional, Dict, Union, Callable
 from abc import ABC, abstractmethod
+from array import array
+from collections import deque
+from itertools import tee
 import math
+import time
+import json
 
 
 def get_op(code: int):
@@ -62,15 +67,20 @@ class Op(ABC):
 
     @staticmethod
     def parse(state: Computer) -> Op:
-        full_code = state.registers[state.pos]
+        return Op.parse_at(state.registers, state.pos)
+
+    @staticmethod
+    def parse_at(registers: Memory, pos: int) -> Op:
+        full_code = registers[pos]
         opcode = full_code % 100
         op_class = get_op(opcode)
         param_count = op_class.param_count()
         # Create tuples of the parameter values and their modes, extracting individual digits from the full opcode
+        # Parameters past the end of the program are missing, even if the buffer has grown to cover them
         params = [(
             p,
             math.floor(full_code / (10 ** (i + 2))) % 10
-        ) for i, p in enumerate(state.registers[state.pos + 1:state.pos + 1 + param_count])]
+        ) for i, p in enumerate(registers[pos + 1:min(pos + 1 + param_count, registers.end)])]
 
         return op_class(*params)
 
@@ -259,59 +269,671 @@ class BaseOffset(Op):
 #
 
 
+# Registers far beyond the program are stored in pages of this many registers
+PAGE_BITS = 10
+PAGE_SIZE = 1 << PAGE_BITS
+PAGE_MASK = PAGE_SIZE - 1
+
+# The number of times execute_compiled() interprets the instruction at a position before compiling a block there,
+# so that code which only runs once (such as a whole program with no loops) isn't worth the cost of compiling
+HOT_BLOCK_VISITS = 2
+
+# Stands in for a decoded position in a computer's decoded cells for each register being watched, so that writes to
+# watched registers are trapped by the same check as writes into decoded code, and unwatched writes cost nothing extra
+WATCHED = -1
+
+# The countdown to the next checkpoint while checkpoints are disabled, which no run is long enough to reach
+NEVER = 1 << 62
+
+
+class Memory:
+    """
+    The registers of an Intcode computer.  The program and the registers following it are held in a contiguous,
+    growable buffer of 64-bit integers, while registers far beyond it are held in fixed-size pages which are only
+    allocated once written to.  Any buffer that has a value too large for 64 bits written to it is converted into a
+    list, so that it can hold integers of any size.
+
+    Copies share their buffer and pages with the original, and each side only copies a buffer or page the first time
+    it writes to it.
+
+    The end of the program is the length of the values the memory was created with.  Computers stop with an error on
+    reaching it, even once the buffer has grown to cover the registers beyond it.
+    """
+
+    def __init__(self, values: Iterable[int] = ()):
+        self.dense = _buffer(values)
+        self.end = len(self.dense)
+        self.pages: Dict[int, Union[array, List[int]]] = dict()
+        self._shared_dense = False
+        self._shared_pages = set()
+
+    def copy(self) -> Memory:
+        """
+        Creates a copy of this memory, sharing its buffer and pages copy-on-write.
+        """
+        other = Memory()
+        other.dense = self.dense
+        other.end = self.end
+        other.pages = dict(self.pages)
+        self._shared_dense = other._shared_dense = True
+        self._shared_pages = set(self.pages)
+        other._shared_pages = set(self.pages)
+        return other
+
+    def writable_size(self) -> int:
+        """
+        Gets the number of registers at the start of the contiguous buffer that may be written to directly, rather
+        than through set().  This is zero while the buffer is shared with a copy.
+        """
+        return 0 if self._shared_dense else len(self.dense)
+
+    def own_dense(self):
+        if self._shared_dense:
+            self.dense = self.dense[:]
+            self._shared_dense = False
+
+    def get(self, reg: int) -> int:
+        if reg < 0:
+            raise Exception("Invalid register position: %d" % reg)
+        if reg < len(self.dense):
+            return self.dense[reg]
+        page = self.pages.get(reg >> PAGE_BITS)
+        return page[reg & PAGE_MASK] if page is not None else 0
+
+    def set(self, reg: int, val: int):
+        if reg < 0:
+            raise Exception("Invalid register position: %d" % reg)
+        size = len(self.dense)
+        if reg >= size:
+            # Grow the buffer to cover registers just past its end, rather than paging them
+            if reg - size < max(size, PAGE_SIZE):
+                self.grow(((reg >> PAGE_BITS) + 1) << PAGE_BITS)
+            else:
+                self._set_paged(reg, val)
+                return
+        if self._shared_dense:
+            self.own_dense()
+        try:
+            self.dense[reg] = val
+        except OverflowError:
+            self.dense = list(self.dense)
+            self.dense[reg] = val
+
+    def _set_paged(self, reg: int, val: int):
+        page_num = reg >> PAGE_BITS
+        page = self.pages.get(page_num)
+        if page is None:
+            page = self.pages[page_num] = array("q", bytes(8 * PAGE_SIZE))
+        elif page_num in self._shared_pages:
+            page = self.pages[page_num] = page[:]
+            self._shared_pages.discard(page_num)
+        try:
+            page[reg & PAGE_MASK] = val
+        except OverflowError:
+            page = self.pages[page_num] = list(page)
+            page[reg & PAGE_MASK] = val
+
+    def grow(self, size: int):
+        """
+        Extends the contiguous buffer to the given size, moving the contents of any pages it now covers into it.
+        """
+        old_size = len(self.dense)
+        if size <= old_size:
+            return
+        values = array("q", bytes(8 * (size - old_size)))
+        for page_num in range(old_size >> PAGE_BITS, ((size - 1) >> PAGE_BITS) + 1):
+            page = self.pages.pop(page_num, None)
+            if page is None:
+                continue
+            self._shared_pages.discard(page_num)
+            page_start = page_num << PAGE_BITS
+            start = max(page_start, old_size)
+            end = min(page_start + PAGE_SIZE, size)
+            if type(page) != array:
+                values = list(values)
+            values[start - old_size:end - old_size] = page[start - page_start:end - page_start]
+            # Anything left in the page beyond the new end of the buffer still belongs in a page
+            for reg in range(end, page_start + PAGE_SIZE):
+                if page[reg - page_start] != 0:
+                    self._set_paged(reg, page[reg - page_start])
+        if type(self.dense) == array and type(values) != array:
+            self.dense = list(self.dense)
+            self._shared_dense = False
+        self.own_dense()
+        self.dense.extend(values)
+
+    def __getitem__(self, item: Union[int, slice]) -> Union[int, Iterable[int]]:
+        if type(item) == slice:
+            return self.dense[item]
+        return self.get(item)
+
+    def __setitem__(self, key: int, value: int):
+        self.set(key, value)
+
+    def __len__(self) -> int:
+        return len(self.dense)
+
+    def __iter__(self):
+        return iter(self.dense)
+
+    def __repr__(self):
+        return repr(list(self.dense))
+
+
+class Snapshot:
+    """
+    The state of a Computer at a particular moment, which can be restored any number of times.  Each restore resumes
+    reading the input source from the point the snapshot was taken, and passes outputs to the same sink.
+    """
+
+    def __init__(self, computer: Computer):
+        self.registers = computer.registers.copy()
+        self.pos = computer.pos
+        self.relative_base = computer.relative_base
+        self.inputs = computer.inputs.copy()
+        self.outputs = computer.outputs.copy()
+
+
+class Profile:
+    """
+    Statistics gathered about the instructions a Computer executes while profiling is enabled.  Times are in seconds.
+    """
+
+    def __init__(self):
+        self.instructions = 0
+        self.opcode_counts: Dict[int, int] = dict()
+        self.pc_counts: Dict[int, int] = dict()
+        # Total time spent running, including time spent waiting for input
+        self.elapsed = 0.0
+        self.input_wait = 0.0
+        self.peak_registers = 0
+        self.peak_pages = 0
+
+    def instructions_per_second(self) -> float:
+        """
+        Gets the rate at which instructions were executed, not counting time spent waiting for input.
+        """
+        running = self.elapsed - self.input_wait
+        return self.instructions / running if running > 0 else 0.0
+
+    def hot_pcs(self, count: int = 10) -> List[Tuple[int, int]]:
+        """
+        Gets the most frequently executed positions, as (position, executions) tuples.
+        """
+        return sorted(self.pc_counts.items(), key=lambda x: (-x[1], x[0]))[:count]
+
+    def record_memory(self, memory: Memory):
+        pages = len(memory.pages)
+        registers = len(memory.dense) + (pages << PAGE_BITS)
+        if registers > self.peak_registers:
+            self.peak_registers = registers
+        if pages > self.peak_pages:
+            self.peak_pages = pages
+
+    def to_dict(self) -> Dict:
+        return {
+            "instructions": self.instructions,
+            "elapsed": self.elapsed,
+            "input_wait": self.input_wait,
+            "instructions_per_second": self.instructions_per_second(),
+            "opcodes": {get_op(opcode).__name__: count for opcode, count in sorted(self.opcode_counts.items())},
+            "hot_pcs": [{"pos": pos, "count": count} for pos, count in self.hot_pcs(len(self.pc_counts))],
+            "peak_registers": self.peak_registers,
+            "peak_pages": self.peak_pages
+        }
+
+    def to_json(self, indent: Optional[int] = None) -> str:
+        return json.dumps(self.to_dict(), indent=indent)
+
+    def __repr__(self):
+        return "Profile(%d instructions, %.0f per second)" % (self.instructions, self.instructions_per_second())
+
+
+class Watchpoint:
+    """
+    A register being watched for writes by a Computer.  Keeps the last value written to the register (starting with
+    its value when the watch began) and the number of writes since, and calls its callback, if any, with the
+    computer, the register and the value after each write.
+    """
+
+    def __init__(self, reg: int, val: int, callback: Optional[Callable[[Computer, int, int], None]] = None):
+        self.reg = reg
+        self.value = val
+        self.writes = 0
+        self.callback = callback
+
+    def record(self, computer: Computer, val: int):
+        self.value = val
+        self.writes += 1
+        if self.callback is not None:
+            self.callback(computer, self.reg, val)
+
+    def __repr__(self):
+        return "Watchpoint([%d] = %d, %d writes)" % (self.reg, self.value, self.writes)
+
+
+class InputChannel:
+    """
+    The values waiting to be read by a computer's Input instructions.  Values appended to the channel are read
+    first, in order, followed by the values of the source iterator, if one is given.
+    """
+
+    def __init__(self, values: Iterable[int] = (), source: Optional[Iterator[int]] = None):
+        self.queue = deque(values)
+        self.source = source
+
+    def take(self) -> Optional[int]:
+        """
+        Removes and returns the next available value, or returns None if there is none.
+        """
+        if len(self.queue) > 0:
+            return self.queue.popleft()
+        if self.source is not None:
+            return next(self.source, None)
+        return None
+
+    def copy(self) -> InputChannel:
+        """
+        Creates an independent channel holding the same values.  The source iterator, if any, is split in two with
+        itertools.tee(), and this channel continues reading from one half while the copy reads from the other, so
+        both go on to read every value it produces.
+        """
+        if self.source is None:
+            return InputChannel(self.queue)
+        self.source, source = tee(self.source)
+        return InputChannel(self.queue, source)
+
+    def append(self, val: int):
+        self.queue.append(val)
+
+    def extend(self, values: Iterable[int]):
+        self.queue.extend(values)
+
+    def __len__(self) -> int:
+        return len(self.queue)
+
+    def __iter__(self):
+        return iter(self.queue)
+
+    def __repr__(self):
+        return repr(list(self.queue))
+
+
+class OutputChannel:
+    """
+    Receives the values produced by a computer's Output instructions.  Values are queued to be read in order, unless
+    a sink is given, in which case each value is passed to it as it is produced instead.
+    """
+
+    def __init__(self, values: Iterable[int] = (), sink: Optional[Callable[[int], None]] = None):
+        self.queue = deque(values)
+        self.sink = sink
+
+    def append(self, val: int):
+        if self.sink is not None:
+            self.sink(val)
+        else:
+            self.queue.append(val)
+
+    def popleft(self) -> int:
+        return self.queue.popleft()
+
+    def copy(self) -> OutputChannel:
+        """
+        Creates an independent channel holding the same values, passing values produced to the same sink, if any.
+        """
+        return OutputChannel(self.queue, self.sink)
+
+    def __len__(self) -> int:
+        return len(self.queue)
+
+    def __iter__(self):
+        return iter(self.queue)
+
+    def __getitem__(self, item: int) -> int:
+        return self.queue[item]
+
+    def __eq__(self, other):
+        return list(self.queue) == list(other)
+
+    def __repr__(self):
+        return repr(list(self.queue))
+
+
+def _incomplete(opcode: int, param_count: int):
+    raise Exception("Invalid number of args (%d) for opcode '%d'." % (param_count, opcode))
+
+
+def _buffer(values: Iterable[int]) -> Union[array, List[int]]:
+    if type(values) == array:
+        return values[:]
+    values = list(values)
+    try:
+        return array("q", values)
+    except OverflowError:
+        return values
+
+
+#
+
+
 class Computer:
 
-    def __init__(self, registers: List[int], pos: int = 0,
-                 inputs: Optional[List[int]] = None,
+    def __init__(self, registers: Union[List[int], Memory], pos: int = 0,
+                 inputs: Optional[Union[Iterable[int], InputChannel]] = None,
                  relative_base: int = 0,
                  input_method: Callable[[Computer], int] = None):
+        self._decoded = dict()
+        self._decoded_cells = dict()
+        self._compiled = dict()
+        self._volatile = set()
+        self._visits = dict()
+        self._leaders = None
+        self._watches: Dict[int, List[Watchpoint]] = dict()
         self.registers = registers
-        self.sparse_registers = dict()
         self.pos = pos
         self.relative_base = relative_base
-        self.inputs = inputs if inputs else []
+        self.inputs = inputs if inputs is not None else []
         self.outputs = []
         self.input_method = input_method
+        self.profile: Optional[Profile] = None
+        self.checkpoint_path: Optional[str] = None
+        self.checkpoint_interval = 0
+        self._until_checkpoint = 0
+
+    @property
+    def registers(self) -> Memory:
+        return self._registers
+
+    @registers.setter
+    def registers(self, registers: Union[List[int], Memory]):
+        self._registers = registers if isinstance(registers, Memory) else Memory(registers)
+        self.clear_decode_cache()
+
+    @property
+    def inputs(self) -> InputChannel:
+        return self._inputs
+
+    @inputs.setter
+    def inputs(self, inputs: Union[Iterable[int], InputChannel]):
+        """
+        Sets the input channel.  Any other iterable is wrapped in a channel: an iterator becomes its source, so
+        that it is only consumed as input is needed, while any other iterable is queued up front.
+        """
+        if isinstance(inputs, InputChannel):
+            self._inputs = inputs
+        elif iter(inputs) is inputs:
+            self._inputs = InputChannel(source=inputs)
+        else:
+            self._inputs = InputChannel(inputs)
 
-    def request_input(self) -> int:
-        if len(self.inputs) == 0:
-            if self.input_method is not None:
-                return self.input_method(self)
-            return int(input("?? "))
+    @property
+    def outputs(self) -> OutputChannel:
+        return self._outputs
+
+    @outputs.setter
+    def outputs(self, outputs: Union[Iterable[int], OutputChannel]):
+        self._outputs = outputs if isinstance(outputs, OutputChannel) else OutputChannel(outputs)
+
+    def snapshot(self) -> Snapshot:
+        """
+        Captures the current state of this computer.  Memory is shared with the snapshot copy-on-write, so this
+        doesn't copy any registers.
+        """
+        return Snapshot(self)
+
+    def restore(self, snapshot: Snapshot):
+        """
+        Returns this computer to the state captured in the given snapshot.
+        """
+        self.registers = snapshot.registers.copy()
+        self.pos = snapshot.pos
+        self.relative_base = snapshot.relative_base
+        self.inputs = snapshot.inputs.copy()
+        self.outputs = snapshot.outputs.copy()
+
+    def fork(self) -> Computer:
+        """
+        Creates an independent computer in the same state as this one, sharing memory copy-on-write, along with the
+        code decoded and compiled from it.  Both computers go on to read the rest of the input source, and pass
+        outputs to the same sink (see InputChannel.copy() and OutputChannel.copy()).  Watchpoints aren't copied.
+        """
+        computer = Computer(self.registers.copy(), pos=self.pos, inputs=self.inputs.copy(),
+                            relative_base=self.relative_base, input_method=self.input_method)
+        computer.outputs = self.outputs.copy()
+        # The copy's memory is identical, so the code decoded and compiled from this computer's memory is valid for
+        # it too, and it doesn't need to warm up again
+        computer._decoded.update(self._decoded)
+        computer._compiled.update(self._compiled)
+        for cell, positions in self._decoded_cells.items():
+            positions = [pos for pos in positions if pos != WATCHED]
+            if len(positions) > 0:
+                computer._decoded_cells[cell] = positions
+        computer._volatile.update(self._volatile)
+        computer._visits.update(self._visits)
+        computer._leaders = self._leaders
+        return computer
+
+    def enable_profiling(self) -> Profile:
+        """
+        Starts recording statistics about every instruction executed, by any of the run methods, into a new Profile.
+        Profiling runs every instruction through the interpreter, without fusing instructions together.
+        """
+        self.clear_decode_cache()
+        self.profile = Profile()
+        self.profile.record_memory(self.registers)
+        return self.profile
+
+    def disable_profiling(self) -> Optional[Profile]:
+        profile = self.profile
+        self.profile = None
+        return profile
+
+    def enable_checkpoints(self, path: str, interval: int):
+        """
+        Saves a checkpoint to the given file every time the given number of instructions have been executed, by any of
+        the run methods.  run() and run_until_output() count every instruction through the interpreter, without fusing
+        instructions together, while the fast and compiled run methods count instructions as they run (see
+        execute_compiled() for how compiled blocks are counted).
+        """
+        self.clear_decode_cache()
+        self.checkpoint_path = path
+        self.checkpoint_interval = interval
+        self._until_checkpoint = interval
+
+    def disable_checkpoints(self):
+        self.checkpoint_path = None
+
+    def save_checkpoint(self, path: str):
+        """
+        Saves the state of this computer to the given file (see shared.IntcodeCheckpoint), from which it can be
+        resumed with Computer.load_checkpoint().  Inputs waiting in the input channel are saved, but not its source
+        iterator, nor the input method.
+        """
+        from shared.IntcodeCheckpoint import save_checkpoint
+        save_checkpoint(self, path)
+
+    @classmethod
+    def load_checkpoint(cls, path: str, input_method: Callable[[Computer], int] = None) -> Computer:
+        from shared.IntcodeCheckpoint import load_checkpoint
+        computer = load_checkpoint(path)
+        computer.input_method = input_method
+        return computer
+
+    def watch(self, reg: int, callback: Optional[Callable[[Computer, int, int], None]] = None) -> Watchpoint:
+        """
+        Starts watching the given register for writes by the program, in any of the run methods.  Without a callback,
+        the returned Watchpoint simply tracks the last value written.  Writes to registers that aren't watched don't
+        slow down execution, while each watched write leaves any compiled block being run, and stops loops writing it
+        from being run in closed form (see shared.IntcodeLoops).  Callbacks may inspect the computer, but must not
+        modify its registers.
+
+        @param callback: Called as callback(computer, register, value) after each write
+        """
+        watchpoint = Watchpoint(reg, self.registers.get(reg), callback)
+        if reg in self._watches:
+            self._watches[reg].append(watchpoint)
         else:
-            return self.inputs.pop(0)
+            self._watches[reg] = [watchpoint]
+            if reg in self._decoded_cells:
+                self._decoded_cells[reg].append(WATCHED)
+            else:
+                self._decoded_cells[reg] = [WATCHED]
+        return watchpoint
+
+    def unwatch(self, watchpoint: Watchpoint):
+        watches = self._watches.get(watchpoint.reg, [])
+        if watchpoint not in watches:
+            return
+        watches.remove(watchpoint)
+        if len(watches) == 0:
+            del self._watches[watchpoint.reg]
+            self._decoded_cells[watchpoint.reg].remove(WATCHED)
+            if len(self._decoded_cells[watchpoint.reg]) == 0:
+                del self._decoded_cells[watchpoint.reg]
+
+    def request_input(self) -> int:
+        val = self.inputs.take()
+        if val is not None:
+            return val
+        if self.input_method is not None:
+            return self.input_method(self)
+        return int(input("?? "))
 
     def output(self, val: int):
         self.outputs.append(val)
 
+    def decode(self, fuse: bool = True) -> Op:
+        """
+        Gets the Op at the current position, reusing a previously decoded instance if the instruction has not been
+        written to since it was decoded.
+
+        @param fuse: If True, common idioms beginning at this position are decoded as a single superinstruction (see
+        shared.IntcodePeephole)
+        """
+        op = self._decoded.get(self.pos)
+        if op is None:
+            op = Op.parse(self)
+            if fuse:
+                from shared.IntcodePeephole import fuse as fuse_idiom
+                op = fuse_idiom(self.registers, self.pos, op)
+            self._decoded[self.pos] = op
+            # Remember which cells this instruction was decoded from, so that writes to them invalidate it
+            for cell in range(self.pos, self.pos + 1 + op.param_count()):
+                if cell in self._decoded_cells:
+                    self._decoded_cells[cell].append(self.pos)
+                else:
+                    self._decoded_cells[cell] = [self.pos]
+        return op
+
+    def invalidate_decoded(self, reg: int):
+        """
+        Discards any decoded instructions or compiled blocks that were read from the given register.
+        """
+        for pos in self._decoded_cells.pop(reg, ()):
+            self._decoded.pop(pos, None)
+            if pos in self._compiled:
+                del self._compiled[pos]
+                # Rather than repeatedly recompiling code that modifies itself, read the register from memory
+                # whenever it's needed in future
+                self._volatile.add(reg)
+        if reg in self._watches:
+            self._decoded_cells[reg] = [WATCHED]
+
+    def handle_write(self, reg: int):
+        """
+        Called after the program writes to a register in the decoded cells: discards any code decoded from it, and
+        notifies any watchpoints on it.
+        """
+        self.invalidate_decoded(reg)
+        watches = self._watches.get(reg)
+        if watches is not None:
+            val = self.registers.get(reg)
+            for watchpoint in watches:
+                watchpoint.record(self, val)
+
+    def clear_decode_cache(self):
+        """
+        Discards all decoded instructions and compiled blocks.  Must be called after writing into registers
+        directly (rather than through set_register()) once the computer has started running.
+        """
+        self._decoded.clear()
+        self._decoded_cells.clear()
+        self._compiled.clear()
+        self._volatile.clear()
+        self._visits.clear()
+        self._leaders = None
+        for reg in self._watches:
+            self._decoded_cells[reg] = [WATCHED]
+
     def next(self) -> bool:
-        shift = Op.parse(self).execute(self)
+        return self.execute(self.decode())
+
+    def execute(self, op: Op) -> bool:
+        """
+        Executes the given Op, which must have been decoded at the current position, and moves to the next position.
+        Returns False if the computer halted.
+        """
+        shift = op.execute(self)
         if shift is None:
             return False
         self.pos += shift
-        if self.pos >= len(self.registers):
+        if self.pos >= self.registers.end:
             raise Exception("Invalid state.")
         return True
 
-    def run(self) -> List[int]:
-        running = self.pos < len(self.registers)
+    def take_output(self, op: Output) -> int:
+        """
+        Executes the given Output Op, which must have been decoded at the current position, returning its value
+        rather than sending it to the output channel.
+        """
+        val = op.param_val(0, self)
+        self.pos += 2
+        if self.pos >= self.registers.end:
+            raise Exception("Invalid state.")
+        return val
+
+    def run(self) -> OutputChannel:
+        if self.profile is not None or self.checkpoint_path is not None:
+            self.execute_instrumented(until_output=False)
+            return self.outputs
+        running = self.pos < self.registers.end
         while running:
             running = self.next()
         return self.outputs
 
     def run_until_output(self) -> Optional[int]:
         """
-        Operates similar to run(), but when it detects output having been generated, pauses the running
-        of the computer and pops that output value from the output list and returns it.  If the computer halts
-        rather than producing an output, returns None.
+        Operates similar to run(), but when it reaches an Output instruction, pauses the running of the computer
+        and returns that output value, rather than sending it to the output channel.  Any values already waiting in
+        the output channel are returned first.  If the computer halts rather than producing an output, returns None.
         """
-        running = self.pos < len(self.registers)
+        if len(self.outputs) > 0:
+            return self.outputs.popleft()
+        if self.profile is not None or self.checkpoint_path is not None:
+            return self.execute_instrumented(until_output=True)
+        running = self.pos < self.registers.end
         while running:
-            if len(self.outputs) > 0:
-                return self.outputs.pop(0)
-            running = self.next()
+            op = self.decode()
+            if op.code == 4:
+                return self.take_output(op)
+            running = self.execute(op)
         return None
 
+    def iter_outputs(self, run_until_output: Callable[[Computer], Optional[int]] = None) -> Iterator[int]:
+        """
+        Runs the computer until it halts, yielding each output value as it is produced.
+
+        @param run_until_output: The method used to run the computer until each output, e.g.
+        Computer.run_until_output_compiled.  Defaults to Computer.run_until_output.
+        """
+        run_until_output = run_until_output if run_until_output is not None else Computer.run_until_output
+        while True:
+            val = run_until_output(self)
+            if val is None:
+                return
+            yield val
+
     def run_until_outputs(self, count: int) -> Optional[List[int]]:
         values = []
         for i in range(count):
@@ -321,24 +943,429 @@ class Computer:
             values.append(o)
         return values
 
+    def run_fast(self) -> OutputChannel:
+        """
+        Equivalent to run(), but uses the allocation-free interpreter loop in execute_fast().
+        """
+        self.execute_fast(until_output=False)
+        return self.outputs
+
+    def run_until_output_fast(self) -> Optional[int]:
+        """
+        Equivalent to run_until_output(), but uses the allocation-free interpreter loop in execute_fast().
+        """
+        if len(self.outputs) > 0:
+            return self.outputs.popleft()
+        return self.execute_fast(until_output=True)
+
+    def run_until_outputs_fast(self, count: int) -> Optional[List[int]]:
+        values = []
+        for i in range(count):
+            o = self.run_until_output_fast()
+            if o is None:
+                return None
+            values.append(o)
+        return values
+
+    def execute_fast(self, until_output: bool) -> Optional[int]:
+        """
+        Interprets instructions in a single loop, decoding opcodes and parameter modes with integer arithmetic
+        on local variables rather than building Op instances.  Behaves identically to repeated calls to next().
+
+        @param until_output: If True, stops after the first Output instruction and returns its value, rather than
+        adding it to the output list.
+        @return The output value if stopping on output, otherwise None once the computer halts.
+        """
+        if self.profile is not None:
+            return self.execute_instrumented(until_output)
+        # Instructions executed here don't go through the decode cache, so don't leave it holding stale entries
+        if len(self._decoded) > 0:
+            self.clear_decode_cache()
+        watches = self._watches
+        # Instructions left until the next checkpoint, which is never reached if checkpoints are disabled
+        countdown = self._until_checkpoint if self.checkpoint_path is not None else NEVER
+
+        memory = self.registers
+        end = memory.end
+        mem = memory.dense
+        size = len(mem)
+        # Writes beyond this go through the Memory object, which copies the buffer first if it is shared
+        writable = memory.writable_size()
+        pc = self.pos
+        base = self.relative_base
+        if pc >= end:
+            return None
+
+        try:
+            while True:
+                if countdown <= 0:
+                    self.pos = pc
+                    self.relative_base = base
+                    self.save_checkpoint(self.checkpoint_path)
+                    countdown = self.checkpoint_interval
+
+                code = mem[pc]
+                opcode = code % 100
+                if opcode == 99:
+                    return None
+
+                mode = code // 100 % 10
+                p = mem[pc + 1]
+
+                if opcode == 3:
+                    if mode == 2:
+                        p += base
+                    elif mode != 0:
+                        raise Exception("Invalid mode: %d" % mode)
+                    if p < 0:
+                        raise Exception("Invalid register position: %d" % p)
+                    if pc + 2 > end:
+                        _incomplete(opcode, end - pc - 1)
+                    # Input handlers may inspect or modify the computer, so synchronize state around the request
+                    self.pos = pc
+                    self.relative_base = base
+                    val = self.request_input()
+                    # Input handlers may interrupt the instruction, so it only counts once it has its input
+                    countdown -= 1
+                    memory = self.registers
+                    end = memory.end
+                    memory.set(p, val)
+                    if p in watches:
+                        self.handle_write(p)
+                    mem = memory.dense
+                    size = len(mem)
+                    writable = memory.writable_size()
+                    pc += 2
+                    if pc >= end:
+                        raise Exception("Invalid state.")
+                    continue
+
+                countdown -= 1
+                # First parameter is always read
+                if mode == 0:
+                    if p < 0:
+                        raise Exception("Invalid register position: %d" % p)
+                    x = mem[p] if p < size else memory.get(p)
+                elif mode == 1:
+                    x = p
+                elif mode == 2:
+                    p += base
+                    if p < 0:
+                        raise Exception("Invalid register position: %d" % p)
+                    x = mem[p] if p < size else memory.get(p)
+                else:
+                    raise Exception("Invalid mode: %d" % mode)
+
+                if opcode == 4:
+                    if pc + 2 > end:
+                        _incomplete(opcode, end - pc - 1)
+                    pc += 2
+                    if until_output:
+                        if pc >= end:
+                            raise Exception("Invalid state.")
+                        return x
+                    self.output(x)
+                    memory = self.registers
+                    end = memory.end
+                    mem = memory.dense
+                    size = len(mem)
+                    writable = memory.writable_size()
+                elif opcode == 9:
+                    if pc + 2 > end:
+                        _incomplete(opcode, end - pc - 1)
+                    base += x
+                    pc += 2
+                elif (opcode == 5 and x == 0) or (opcode == 6 and x != 0):
+                    # Jumps not taken never read their target
+                    if pc + 3 > end:
+                        _incomplete(opcode, end - pc - 1)
+                    pc += 3
+                else:
+                    # Instructions must lie entirely within the program, even once the buffer extends beyond it
+                    if pc + (3 if opcode == 5 or opcode == 6 else 4) > end:
+                        _incomplete(opcode, end - pc - 1)
+                    # Second parameter is read by every other instruction, and by jumps that are taken
+                    mode = code // 1000 % 10
+                    p = mem[pc + 2]
+                    if mode == 0:
+                        if p < 0:
+                            raise Exception("Invalid register position: %d" % p)
+                        y = mem[p] if p < size else memory.get(p)
+                    elif mode == 1:
+                        y = p
+                    elif mode == 2:
+                        p += base
+                        if p < 0:
+                            raise Exception("Invalid register position: %d" % p)
+                        y = mem[p] if p < size else memory.get(p)
+                    else:
+                        raise Exception("Invalid mode: %d" % mode)
+
+                    if opcode == 5 or opcode == 6:
+                        pc = y
+                    else:
+                        if opcode == 1:
+                            val = x + y
+                        elif opcode == 2:
+                            val = x * y
+                        elif opcode == 7:
+                            val = 1 if x < y else 0
+                        elif opcode == 8:
+                            val = 1 if x == y else 0
+                        else:
+                            raise Exception("Invalid opcode: %d" % opcode)
+
+                        # Third parameter is always written to
+                        mode = code // 10000 % 10
+                        p = mem[pc + 3]
+                        if mode == 2:
+                            p += base
+                        elif mode != 0:
+                            raise Exception("Invalid mode: %d" % mode)
+                        if p < 0:
+                            raise Exception("Invalid register position: %d" % p)
+                        if p < writable:
+                            try:
+                                mem[p] = val
+                            except OverflowError:
+                                memory.set(p, val)
+                                mem = memory.dense
+                        else:
+                            # Writing through the Memory object may copy, grow or replace the buffer
+                            memory.set(p, val)
+                            mem = memory.dense
+                            size = len(mem)
+                            writable = memory.writable_size()
+                        if p in watches:
+                            self.pos = pc
+                            self.relative_base = base
+                            self.handle_write(p)
+                            # Watch callbacks may snapshot or fork the computer, sharing its buffer copy-on-write
+                            memory = self.registers
+                            end = memory.end
+                            mem = memory.dense
+                            size = len(mem)
+                            writable = memory.writable_size()
+                        pc += 4
+
+                if pc >= end:
+                    raise Exception("Invalid state.")
+        finally:
+            self.pos = pc
+            self.relative_base = base
+            if self.checkpoint_path is not None:
+                self._until_checkpoint = countdown
+
+    def run_compiled(self) -> OutputChannel:
+        """
+        Equivalent to run(), but executes blocks compiled by shared.IntcodeCompiler via execute_compiled().
+        """
+        self.execute_compiled(until_output=False)
+        return self.outputs
+
+    def run_until_output_compiled(self) -> Optional[int]:
+        """
+        Equivalent to run_until_output(), but executes blocks compiled by shared.IntcodeCompiler via
+        execute_compiled().
+        """
+        if len(self.outputs) > 0:
+            return self.outputs.popleft()
+        return self.execute_compiled(until_output=True)
+
+    def run_until_outputs_compiled(self, count: int) -> Optional[List[int]]:
+        values = []
+        for i in range(count):
+            o = self.run_until_output_compiled()
+            if o is None:
+                return None
+            values.append(o)
+        return values
+
+    def execute_compiled(self, until_output: bool) -> Optional[int]:
+        """
+        Runs the program one basic block at a time, compiling each block to Python once its position has been
+        reached HOT_BLOCK_VISITS times, and interpreting instructions until then.  Writes into a compiled block discard
+        it.  When it is recompiled, the register written to is read from memory
+        if it held a parameter, or the instruction is interpreted if it held an opcode.
+
+        Checkpoints are saved between blocks, once at least the checkpoint interval's worth of instructions have run
+        since the last.  Each block counts as a single pass through its instructions, even where a loop it holds is run
+        in closed form, and fused instructions count once, so checkpoints are at most as far apart as the interval.
+
+        @param until_output: If True, stops after the first output is produced and returns its value, rather than
+        adding it to the output list.
+        @return The output value if stopping on output, otherwise None once the computer halts.
+        """
+        if self.profile is not None:
+            return self.execute_instrumented(until_output)
+        from shared.IntcodeCompiler import compile_block, find_leaders, HALT, RELOAD
+
+        compiled = self._compiled
+        cells = self._decoded_cells
+        visits = self._visits
+        countdown = self._until_checkpoint if self.checkpoint_path is not None else NEVER
+
+        memory = self.registers
+        end = memory.end
+        mem = memory.dense
+        size = len(mem)
+        writable = memory.writable_size()
+        pc = self.pos
+        base = self.relative_base
+        if pc >= end:
+            return None
+
+        try:
+            while True:
+                if countdown <= 0:
+                    self.pos = pc
+                    self.relative_base = base
+                    self.save_checkpoint(self.checkpoint_path)
+                    countdown = self.checkpoint_interval
+
+                block = compiled.get(pc)
+                if block is None:
+                    visited = visits.get(pc, 0) + 1
+                    visits[pc] = visited
+                    if visited >= HOT_BLOCK_VISITS and pc not in self._volatile:
+                        if self._leaders is None:
+                            self._leaders = find_leaders(mem)
+                        result = compile_block(mem, pc, self._leaders, self._volatile, memory.end)
+                        if result is not None:
+                            block, block_cells = result
+                            self._register_block(pc, block, block_cells)
+
+                    if block is None:
+                        # Fall back to interpreting a single instruction
+                        self.pos = pc
+                        self.relative_base = base
+                        op = self.decode()
+                        if until_output and op.code == 4:
+                            val = self.take_output(op)
+                            pc = self.pos
+                            countdown -= 1
+                            return val
+                        running = self.execute(op)
+                        if running:
+                            countdown -= 1
+                        pc = self.pos
+                        base = self.relative_base
+                        memory = self.registers
+                        end = memory.end
+                        mem = memory.dense
+                        size = len(mem)
+                        writable = memory.writable_size()
+                        if not running:
+                            return None
+                        continue
+
+                pc, base, out = block(self, mem, memory, size, writable, base, cells)
+                countdown -= block.instructions
+                if out is not None:
+                    if out is HALT:
+                        return None
+                    if out is not RELOAD:
+                        if until_output:
+                            if pc >= end:
+                                raise Exception("Invalid state.")
+                            return out
+                        self.output(out)
+                    # Input and output handlers may have modified the computer, and writes through the Memory
+                    # object may have copied, grown or replaced its buffer
+                    memory = self.registers
+                    end = memory.end
+                    mem = memory.dense
+                    size = len(mem)
+                    writable = memory.writable_size()
+                if pc >= end:
+                    raise Exception("Invalid state.")
+        finally:
+            self.pos = pc
+            self.relative_base = base
+            if self.checkpoint_path is not None:
+                self._until_checkpoint = countdown
+
+    def execute_instrumented(self, until_output: bool) -> Optional[int]:
+        """
+        Interprets instructions one at a time, as next() does, recording each into the profile if profiling, and
+        saving a checkpoint at every checkpoint interval if checkpoints are enabled.
+
+        @param until_output: If True, stops after the first Output instruction and returns its value, rather than
+        adding it to the output list.
+        @return The output value if stopping on output, otherwise None once the computer halts.
+        """
+        profile = self.profile
+        start = time.perf_counter()
+        try:
+            while self.pos < self.registers.end:
+                pos = self.pos
+                op = self.decode(fuse=False)
+                opcode = op.code
+                if until_output and opcode == 4:
+                    val = self.take_output(op)
+                    running = True
+                elif opcode == 3 and profile is not None:
+                    waiting = time.perf_counter()
+                    try:
+                        running = self.execute(op)
+                    finally:
+                        profile.input_wait += time.perf_counter() - waiting
+                else:
+                    running = self.execute(op)
+
+                # Only count instructions once they've completed, since input handlers may interrupt an Input to have
+                # it executed again later
+                if profile is not None:
+                    profile.instructions += 1
+                    profile.opcode_counts[opcode] = profile.opcode_counts.get(opcode, 0) + 1
+                    profile.pc_counts[pos] = profile.pc_counts.get(pos, 0) + 1
+                    if opcode == 1 or opcode == 2 or opcode == 3 or opcode == 7 or opcode == 8:
+                        profile.record_memory(self.registers)
+                if self.checkpoint_path is not None and running:
+                    self._until_checkpoint -= 1
+                    if self._until_checkpoint <= 0:
+                        self.save_checkpoint(self.checkpoint_path)
+                        self._until_checkpoint = self.checkpoint_interval
+
+                if until_output and opcode == 4:
+                    return val
+                if not running:
+                    return None
+            return None
+        finally:
+            if profile is not None:
+                profile.elapsed += time.perf_counter() - start
+
+    def _register_block(self, pos: int, block: Callable, block_cells: List[int]):
+        self._compiled[pos] = block
+        for cell in block_cells:
+            if cell in self._decoded_cells:
+                self._decoded_cells[cell].append(pos)
+            else:
+                self._decoded_cells[cell] = [pos]
+
     def get_register(self, reg: int) -> int:
-        if reg < 0:
-            raise Exception("Invalid register position: %d" % reg)
-        return self.registers[reg] if reg < len(self.registers) else \
-            self.sparse_registers[reg] if reg in self.sparse_registers else 0
+        return self.registers.get(reg)
 
     def set_register(self, reg: int, val: int):
-        if reg < 0:
-            raise Exception("Invalid register position: %d" % reg)
-        if reg < len(self.registers):
-            self.registers[reg] = val
-        else:
-            self.sparse_registers[reg] = val
+        self.registers.set(reg, val)
+        if reg in self._decoded_cells:
+            self.handle_write(reg)
 
     @classmethod
     def from_string(cls, s: str, inputs: Optional[List[int]] = None) -> Computer:
         return Computer(cls.parse_registers(s), inputs=inputs)
 
+    @classmethod
+    def from_file(cls, path: str, inputs: Optional[List[int]] = None) -> Computer:
+        """
+        Loads the program in the given file, using a cached binary image of it where possible (see
+        shared.IntcodeLoader).
+        """
+        from shared.IntcodeLoader import load_program
+        return Computer(load_program(path), inputs=inputs)
+
     @staticmethod
     def parse_registers(s: str) -> List[int]:
-        return [int(x.strip()) for x in s.split(",")]
+        # int() ignores surrounding whitespace itself
+        return list(map(int, s.split(",")))
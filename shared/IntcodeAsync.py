@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+from typing import List, Optional, Union, Iterable
+import asyncio
+
+from shared.Intcode import Computer, Memory, InputChannel, OutputChannel
+
+
+class InputRequired(Exception):
+    """
+    Raised from an AsyncComputer's input method to suspend it while it waits for input.
+    """
+    pass
+
+
+class AsyncComputer(Computer):
+    """
+    A Computer whose Input instructions wait on an asyncio.Queue, and whose Output instructions put onto one.
+    Computers can be wired together by sharing queues (see connect()), and run concurrently on one event loop.
+
+    The computer runs synchronously (using compiled blocks) for as long as it has input available, and only yields
+    to the event loop when it is blocked waiting for input.  Queues are bound to the event loop on older versions
+    of Python, so computers should be created within the coroutine that runs them.
+    """
+
+    def __init__(self, registers: Union[List[int], Memory], pos: int = 0,
+                 inputs: Optional[Union[Iterable[int], InputChannel]] = None,
+                 relative_base: int = 0,
+                 input_queue: Optional[asyncio.Queue] = None,
+                 output_queue: Optional[asyncio.Queue] = None):
+        super(AsyncComputer, self).__init__(registers, pos=pos, inputs=inputs, relative_base=relative_base,
+                                            input_method=AsyncComputer.take_queued_input)
+        self.input_queue = input_queue if input_queue is not None else asyncio.Queue()
+        self.output_queue = output_queue if output_queue is not None else asyncio.Queue()
+        self.outputs = OutputChannel(sink=self.send_output)
+        self.last_output = None
+
+    def take_queued_input(self) -> int:
+        """
+        Takes input that has already arrived on the input queue, or suspends the computer if there is none.
+        """
+        if self.input_queue.empty():
+            raise InputRequired()
+        return self.input_queue.get_nowait()
+
+    def send_output(self, val: int):
+        self.last_output = val
+        self.output_queue.put_nowait(val)
+
+    async def run_async(self) -> Optional[int]:
+        """
+        Runs the computer until it halts, waiting for input whenever none is available.
+
+        @return The last value output by the computer, if any
+        """
+        while True:
+            try:
+                self.execute_compiled(until_output=False)
+                return self.last_output
+            except InputRequired:
+                # The computer is left at the Input instruction, which reads this value once it is resumed
+                self.inputs.append(await self.input_queue.get())
+
+
+#
+
+
+def connect(*computers: AsyncComputer, loop_back: bool = False):
+    """
+    Wires the computers into a chain, with the outputs of each being the inputs of the next.
+
+    @param loop_back: If True, also wires the outputs of the last computer to the inputs of the first
+    """
+    for sender, receiver in zip(computers, computers[1:]):
+        sender.output_queue = receiver.input_queue
+    if loop_back and len(computers) > 0:
+        computers[-1].output_queue = computers[0].input_queue
+
+
+async def run_all(*computers: AsyncComputer) -> List[Optional[int]]:
+    """
+    Runs all of the computers concurrently until they have all halted, returning the last output of each.
+    """
+    return list(await asyncio.gather(*(computer.run_async() for computer in computers)))
@@ -0,0 +1,248 @@
+from __future__ import annotations
+
+from typing import List, Optional, Dict, Iterable
+from collections import deque
+
+import numpy as np
+
+from shared.Intcode import Computer, get_op
+
+
+INT64_MIN = np.iinfo(np.int64).min
+
+
+class BatchComputer:
+    """
+    Runs many instances (lanes) of one Intcode program in lockstep.  The registers of all lanes are held in a single
+    (lanes x registers) array, and each step applies every instruction as one vector operation across all the lanes
+    that are at the same position and have the same instruction there.  Lanes whose control flow diverges are split
+    into separate groups automatically.
+
+    A lane that would crash a Computer (an invalid opcode, mode or register, running out of input, or producing a
+    value too large for 64 bits) is halted, with the reason recorded in errors.
+    """
+
+    def __init__(self, registers: List[int], lanes: int, inputs: Optional[List[List[int]]] = None):
+        self.registers = np.tile(np.array(registers, dtype=np.int64), (lanes, 1))
+        # The end of the program, at which lanes stop with an error, even once the registers have grown beyond it
+        self.end = len(registers)
+        self.pos = np.zeros(lanes, dtype=np.int64)
+        self.relative_base = np.zeros(lanes, dtype=np.int64)
+        self.halted = np.zeros(lanes, dtype=bool)
+        self.inputs = [deque(x) for x in inputs] if inputs is not None else [deque() for _ in range(lanes)]
+        self.outputs = [[] for _ in range(lanes)]
+        self.errors: Dict[int, str] = dict()
+
+    @property
+    def lanes(self) -> int:
+        return self.registers.shape[0]
+
+    def set_register(self, reg: int, values: Iterable[int]):
+        """
+        Sets the given register in every lane, taking one value per lane.
+        """
+        self._ensure_size(reg + 1)
+        self.registers[:, reg] = np.fromiter(values, dtype=np.int64, count=self.lanes)
+
+    def run(self) -> List[List[int]]:
+        """
+        Runs all lanes until they have halted, and returns the outputs of each lane.
+        """
+        while self.step():
+            pass
+        return self.outputs
+
+    def step(self) -> bool:
+        """
+        Executes one instruction in every lane that hasn't halted.
+
+        @return False if every lane had already halted, otherwise True
+        """
+        running = np.flatnonzero(~self.halted)
+        if len(running) == 0:
+            return False
+
+        positions = self.pos[running]
+        codes = self.registers[running, positions]
+
+        # Most of the time every lane is running the same instruction, so avoid sorting them into groups
+        if (positions == positions[0]).all() and (codes == codes[0]).all():
+            self._execute(running, int(positions[0]), int(codes[0]))
+            return True
+
+        order = np.lexsort((codes, positions))
+        running, positions, codes = running[order], positions[order], codes[order]
+        boundaries = np.flatnonzero((np.diff(positions) != 0) | (np.diff(codes) != 0)) + 1
+        for group in np.split(np.arange(len(running)), boundaries):
+            self._execute(running[group], int(positions[group[0]]), int(codes[group[0]]))
+        return True
+
+    def lane(self, lane: int) -> Computer:
+        """
+        Creates a Computer in the current state of the given lane, to continue running it on its own.
+        """
+        computer = Computer([int(x) for x in self.registers[lane]], pos=int(self.pos[lane]),
+                            inputs=list(self.inputs[lane]), relative_base=int(self.relative_base[lane]))
+        computer.outputs = list(self.outputs[lane])
+        computer.registers.end = self.end
+        return computer
+
+    #
+
+    def _execute(self, lanes: np.ndarray, pos: int, code: int):
+        """
+        Executes the given instruction at the given position in all of the given lanes.
+        """
+        opcode = code % 100
+        if opcode == 99:
+            self.halted[lanes] = True
+            return
+        try:
+            param_count = get_op(opcode).param_count()
+        except KeyError:
+            self._crash(lanes, "Invalid opcode: %d" % opcode)
+            return
+        if pos + param_count >= self.end:
+            self._crash(lanes, "Invalid state.")
+            return
+
+        params = self.registers[lanes, pos + 1:pos + 1 + param_count]
+
+        # Find the register referred to by each parameter (or None for immediate mode).  A jump's target is only
+        # resolved in the lanes that take the jump, as a Computer only reads it then.
+        addresses = []
+        valid = np.ones(len(lanes), dtype=bool)
+        for i in range(1 if opcode == 5 or opcode == 6 else param_count):
+            mode = code // (10 ** (i + 2)) % 10
+            written = i == param_count - 1 and opcode in (1, 2, 3, 7, 8)
+            if mode == 1 and not written:
+                addresses.append(None)
+                continue
+            if mode == 0:
+                address = params[:, i]
+            elif mode == 2:
+                address = self.relative_base[lanes] + params[:, i]
+            else:
+                self._crash(lanes, "Invalid mode: %d" % mode)
+                return
+            valid &= address >= 0
+            addresses.append(address)
+
+        if not valid.all():
+            self._crash(lanes[~valid], "Invalid register position")
+            lanes = lanes[valid]
+            params = params[valid]
+            addresses = [a[valid] if a is not None else None for a in addresses]
+            if len(lanes) == 0:
+                return
+
+        def value(num: int) -> np.ndarray:
+            return params[:, num] if addresses[num] is None else self._read(lanes, addresses[num])
+
+        if opcode == 1 or opcode == 2:
+            x, y = value(0), value(1)
+            with np.errstate(over="ignore"):
+                result = x + y if opcode == 1 else x * y
+            overflowed = _overflowed(opcode, x, y, result)
+            if overflowed.any():
+                self._crash(lanes[overflowed], "Value too large for 64 bits")
+                lanes, result, address = lanes[~overflowed], result[~overflowed], addresses[2][~overflowed]
+            else:
+                address = addresses[2]
+            self._write(lanes, address, result)
+            self.pos[lanes] = pos + 4
+        elif opcode == 3:
+            missing = np.array([len(self.inputs[lane]) == 0 for lane in lanes], dtype=bool)
+            if missing.any():
+                self._crash(lanes[missing], "No input available")
+                lanes, address = lanes[~missing], addresses[0][~missing]
+            else:
+                address = addresses[0]
+            values = np.array([self.inputs[lane].popleft() for lane in lanes], dtype=np.int64)
+            self._write(lanes, address, values)
+            self.pos[lanes] = pos + 2
+        elif opcode == 4:
+            for lane, val in zip(lanes, value(0)):
+                self.outputs[lane].append(int(val))
+            self.pos[lanes] = pos + 2
+        elif opcode == 5 or opcode == 6:
+            x = value(0)
+            jump = x != 0 if opcode == 5 else x == 0
+            self.pos[lanes[~jump]] = pos + 3
+            jumping, target = lanes[jump], params[jump, 1]
+            mode = code // 1000 % 10
+            if mode == 0 or mode == 2:
+                address = target if mode == 0 else self.relative_base[jumping] + target
+                invalid = address < 0
+                if invalid.any():
+                    self._crash(jumping[invalid], "Invalid register position")
+                    jumping, address = jumping[~invalid], address[~invalid]
+                target = self._read(jumping, address)
+            elif mode != 1:
+                self._crash(jumping, "Invalid mode: %d" % mode)
+                jumping = jumping[:0]
+            self.pos[jumping] = target
+            lanes = np.concatenate((lanes[~jump], jumping))
+        elif opcode == 7 or opcode == 8:
+            x, y = value(0), value(1)
+            result = (x < y if opcode == 7 else x == y).astype(np.int64)
+            self._write(lanes, addresses[2], result)
+            self.pos[lanes] = pos + 4
+        elif opcode == 9:
+            self.relative_base[lanes] += value(0)
+            self.pos[lanes] = pos + 2
+
+        # Mirror Computer.next(), which won't move to a position beyond the program
+        out_of_bounds = (self.pos[lanes] >= self.end) | (self.pos[lanes] < 0)
+        if out_of_bounds.any():
+            self._crash(lanes[out_of_bounds], "Invalid state.")
+
+    def _read(self, lanes: np.ndarray, addresses: np.ndarray) -> np.ndarray:
+        # Registers beyond the end of the array haven't been written to, so are zero
+        in_range = addresses < self.registers.shape[1]
+        if in_range.all():
+            return self.registers[lanes, addresses]
+        values = np.zeros(len(lanes), dtype=np.int64)
+        values[in_range] = self.registers[lanes[in_range], addresses[in_range]]
+        return values
+
+    def _write(self, lanes: np.ndarray, addresses: np.ndarray, values: np.ndarray):
+        if len(lanes) == 0:
+            return
+        self._ensure_size(int(addresses.max()) + 1)
+        self.registers[lanes, addresses] = values
+
+    def _ensure_size(self, size: int):
+        width = self.registers.shape[1]
+        if size > width:
+            # Grow geometrically, so that programs using a stack don't grow the array at every step
+            self.registers = np.pad(self.registers, ((0, 0), (0, max(size, width * 2) - width)))
+
+    def _crash(self, lanes: np.ndarray, error: str):
+        self.halted[lanes] = True
+        for lane in lanes:
+            self.errors[int(lane)] = error
+
+    #
+
+    @classmethod
+    def from_string(cls, s: str, lanes: int, inputs: Optional[List[List[int]]] = None) -> BatchComputer:
+        return BatchComputer(Computer.parse_registers(s), lanes, inputs=inputs)
+
+    @classmethod
+    def from_file(cls, path: str, lanes: int, inputs: Optional[List[List[int]]] = None) -> BatchComputer:
+        from shared.IntcodeLoader import load_program
+        return BatchComputer(list(load_program(path)), lanes, inputs=inputs)
+
+
+def _overflowed(opcode: int, x: np.ndarray, y: np.ndarray, result: np.ndarray) -> np.ndarray:
+    """
+    Finds the lanes in which an addition or multiplication wrapped around.
+    """
+    if opcode == 1:
+        # Overflow when both operands have the same sign, and the result's sign differs from it
+        return ((x ^ result) & (y ^ result)) < 0
+    nonzero = x != 0
+    safe_x = np.where(nonzero, x, 1)
+    with np.errstate(over="ignore"):
+        return nonzero & ((result // safe_x != y) | ((x == -1) & (y == INT64_MIN)))
@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+from typing import Tuple, List, BinaryIO, Union
+from array import array
+import os
+import struct
+import sys
+
+from shared.Intcode import Computer, Memory, PAGE_SIZE
+
+
+# Checkpoint files begin with this, followed by a version number and the byte order the integers are stored in
+MAGIC = b"INTCKPT\0"
+VERSION = 2
+
+# Lists of values are written this many at a time, so that they never need converting to an array all at once
+CHUNK_SIZE = PAGE_SIZE
+
+INT64_MIN = -(1 << 63)
+INT64_MAX = (1 << 63) - 1
+
+
+def save_checkpoint(computer: Computer, path: str):
+    """
+    Writes the state of the computer to the given file: its registers (contiguous buffer and pages, and the end of
+    the program), position, relative base, and the values waiting in its input and output channels.  The file is written alongside the
+    destination and then moved into place, so an interrupted save never leaves a partial checkpoint behind.
+    """
+    temp_path = path + ".tmp"
+    with open(temp_path, "wb") as f:
+        f.write(MAGIC)
+        f.write(struct.pack("<IcqqQQ", VERSION, sys.byteorder[0].encode(), computer.pos, computer.relative_base,
+                            len(computer.registers.pages), computer.registers.end))
+        write_values(f, computer.registers.dense)
+        for page_num, page in sorted(computer.registers.pages.items()):
+            f.write(struct.pack("<q", page_num))
+            write_values(f, page)
+        write_values(f, list(computer.inputs))
+        write_values(f, list(computer.outputs))
+    os.replace(temp_path, path)
+
+
+def load_checkpoint(path: str) -> Computer:
+    """
+    Reads a computer from a file written by save_checkpoint().
+    """
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise Exception("Not an Intcode checkpoint: %s" % path)
+        version, byteorder, pos, relative_base, page_count, end = _unpack(f, "<IcqqQQ")
+        if version != VERSION:
+            raise Exception("Unsupported checkpoint version: %d" % version)
+        swap = byteorder != sys.byteorder[0].encode()
+
+        memory = Memory()
+        memory.dense = read_values(f, swap)
+        memory.end = end
+        for _ in range(page_count):
+            page_num, = _unpack(f, "<q")
+            memory.pages[page_num] = read_values(f, swap)
+        inputs = read_values(f, swap)
+        outputs = read_values(f, swap)
+
+    computer = Computer(memory, pos=pos, inputs=list(inputs), relative_base=relative_base)
+    computer.outputs = list(outputs)
+    return computer
+
+
+#
+
+
+def write_values(f: BinaryIO, values: Union[array, List[int]]):
+    """
+    Writes a sequence of integers as their count, their 64-bit values, and a table of any values too large for 64
+    bits (which are written as 0 in the 64-bit values), as (index, byte length, bytes).  Arrays are written straight
+    from their buffer.
+    """
+    f.write(struct.pack("<Q", len(values)))
+    overflow = []
+    if type(values) == array:
+        f.write(values)
+    else:
+        for start in range(0, len(values), CHUNK_SIZE):
+            chunk = values[start:start + CHUNK_SIZE]
+            for i, val in enumerate(chunk):
+                if not INT64_MIN <= val <= INT64_MAX:
+                    overflow.append((start + i, val))
+                    chunk[i] = 0
+            f.write(array("q", chunk))
+
+    f.write(struct.pack("<Q", len(overflow)))
+    for index, val in overflow:
+        data = val.to_bytes((val.bit_length() + 8) // 8, "little", signed=True)
+        f.write(struct.pack("<QI", index, len(data)))
+        f.write(data)
+
+
+def read_values(f: BinaryIO, swap: bool = False) -> Union[array, List[int]]:
+    """
+    Reads a sequence of integers written by write_values(), as an array unless it contains values too large for
+    64 bits.  Raises EOFError if the file ends before the sequence does.
+    """
+    count, = _unpack(f, "<Q")
+    values = array("q")
+    values.fromfile(f, count)
+    if swap:
+        values.byteswap()
+    overflow_count, = _unpack(f, "<Q")
+    if overflow_count == 0:
+        return values
+    values = list(values)
+    for _ in range(overflow_count):
+        index, length = _unpack(f, "<QI")
+        if index >= count:
+            raise ValueError("Checkpoint overflow index %d is out of range" % index)
+        data = f.read(length)
+        if len(data) != length:
+            raise EOFError("Checkpoint ended unexpectedly")
+        values[index] = int.from_bytes(data, "little", signed=True)
+    return values
+
+
+def _unpack(f: BinaryIO, fmt: str) -> Tuple:
+    size = struct.calcsize(fmt)
+    data = f.read(size)
+    if len(data) != size:
+        raise EOFError("Checkpoint ended unexpectedly")
+    return struct.unpack(fmt, data)
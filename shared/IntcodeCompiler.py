@@ -0,0 +1,342 @@
+from __future__ import annotations
+
+from typing import Tuple, List, Optional, Set, Callable, Iterable, Hashable, Union
+from array import array
+from collections import OrderedDict
+import hashlib
+
+from shared.Intcode import get_op
+from shared.IntcodeLoops import find_counted_loop
+
+
+# Opcodes after which control does not simply fall through to the next instruction, or which hand control back to
+# the caller (I/O), and so always end a block
+TERMINATORS = {3, 4, 5, 6, 99}
+
+# Returned in place of an output value by blocks ending in a Halt instruction, and by blocks which may have replaced
+# the computer's memory buffer (including all blocks ending in an Input instruction), respectively
+HALT = object()
+RELOAD = object()
+
+# The number of compiled blocks, and of programs' leaders, kept in the caches below before the least recently used
+# are discarded
+BLOCK_CACHE_SIZE = 16384
+LEADER_CACHE_SIZE = 256
+
+
+class _LRUCache:
+    """
+    A mapping holding at most a fixed number of entries, discarding the least recently used entry to make room.
+    """
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.entries: OrderedDict = OrderedDict()
+
+    def get(self, key: Hashable):
+        value = self.entries.get(key)
+        if value is not None:
+            self.entries.move_to_end(key)
+        return value
+
+    def put(self, key: Hashable, value):
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.limit:
+            self.entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+
+# Compiled blocks are shared between computers running the same program, keyed by their start position, the size of
+# the contiguous memory buffer, and the contents of the registers they were compiled from (with None in place of
+# volatile registers)
+_block_cache = _LRUCache(BLOCK_CACHE_SIZE)
+
+# Leaders found in each program, keyed by a hash of the program's contents
+_leader_cache = _LRUCache(LEADER_CACHE_SIZE)
+
+
+def find_leaders(registers: Union[array, List[int]]) -> Set[int]:
+    """
+    Sweeps linearly through the program, finding the positions that begin a basic block: the targets of jumps with
+    immediate-mode destinations, and the instructions following any jump.  Data interleaved with code may produce
+    spurious leaders, which only cause blocks to be split more finely than necessary.
+    """
+    key = _program_hash(registers)
+    leaders = _leader_cache.get(key)
+    if leaders is not None:
+        return leaders
+
+    leaders = {0}
+    pos = 0
+    while pos < len(registers):
+        instr = decode(registers, pos)
+        if instr is None:
+            pos += 1
+            continue
+        opcode, params = instr
+        pos += 1 + len(params)
+        if opcode == 5 or opcode == 6:
+            leaders.add(pos)
+            if params[1][1] == 1:
+                leaders.add(params[1][0])
+    _leader_cache.put(key, leaders)
+    return leaders
+
+
+def _program_hash(registers: Union[array, List[int]]) -> bytes:
+    """
+    Hashes the contents of a program's memory buffer, so that its leaders can be cached without keeping a copy of it.
+    """
+    if type(registers) == array:
+        return hashlib.sha256(registers).digest()
+    return hashlib.sha256(repr(registers).encode()).digest()
+
+
+def decode(registers: List[int], pos: int, volatile: Iterable[int] = ()) \
+        -> Optional[Tuple[int, List[Tuple[Optional[int], int, int]]]]:
+    """
+    Decodes the instruction at the given position into its opcode and a list of (value, mode, register) parameters.
+    Returns None if the instruction is not one that can be compiled, in which case it is left for the interpreter to
+    execute (and to raise the appropriate error for, if it is invalid).
+
+    @param registers: The contiguous buffer of the program's memory
+    @param pos: The position of the instruction
+    @param volatile: Registers which the program writes to while they are part of compiled code.  Parameters held
+    in these are given a value of None, to be read from memory when the instruction is executed.
+    """
+    if pos in volatile:
+        return None
+    full_code = registers[pos]
+    opcode = full_code % 100
+    try:
+        param_count = get_op(opcode).param_count()
+    except KeyError:
+        return None
+    if pos + param_count >= len(registers):
+        return None
+
+    params = []
+    for i in range(param_count):
+        reg = pos + 1 + i
+        mode = full_code // (10 ** (i + 2)) % 10
+        if mode > 2:
+            return None
+        if reg in volatile:
+            params.append((None, mode, reg))
+            continue
+        val = registers[reg]
+        if mode == 0 and val < 0:
+            return None
+        params.append((val, mode, reg))
+
+    # The last parameter of these is always written to, so can't be in immediate mode
+    if opcode in (1, 2, 3, 7, 8) and params[-1][1] == 1:
+        return None
+    return opcode, params
+
+
+def compile_block(registers: List[int], start: int, leaders: Iterable[int], volatile: Iterable[int],
+                  end: Optional[int] = None) -> Optional[Tuple[Callable, List[int]]]:
+    """
+    Compiles the basic block beginning at the given position into a Python function.  The block extends until an
+    instruction in TERMINATORS, the next leader, an Input instruction, or an instruction that can't be compiled.
+
+    The compiled function takes the arguments (computer, buffer, memory, size, writable, relative_base,
+    decoded_cells), where buffer is the memory's contiguous buffer, size is its length and writable is the result of
+    Memory.writable_size(), and returns a tuple of the next position, the new relative base, and either None, an
+    output value, HALT or RELOAD.  Any write into a register in decoded_cells (which holds decoded code or is watched)
+    is handled by the computer, and leaves the block immediately.
+
+    @param registers: The contiguous buffer of the program's memory
+    @param start: The position to start compiling from
+    @param leaders: Positions which should begin their own block
+    @param volatile: Registers which the program writes to while they are part of compiled code.  Instructions
+    whose opcode is in one of these are left to the interpreter, and parameters in them are read from memory each
+    time the instruction is executed, rather than being compiled in as constants.
+    @param end: The end of the program (see Memory.end), before which the block stops, since the computer stops on
+    reaching it.  Defaults to the end of the buffer.
+    @return A tuple of the compiled function and the registers whose values it was compiled from, or None if not
+    even the first instruction could be compiled.
+    """
+    size = len(registers)
+    instructions = []
+    pos = start
+    end = end if end is not None else size
+    while pos < end:
+        if pos != start and pos in leaders:
+            break
+        instr = decode(registers, pos, volatile)
+        if instr is None:
+            break
+        opcode, params = instr
+        # Instructions running past the end of the program are left for the interpreter to fail on
+        if pos + len(params) >= end:
+            break
+        # Input handlers may interrupt the computer by raising an exception, so begin a new block at each Input
+        # instruction, so that the computer is left at the Input's position rather than part-way through a block
+        if opcode == 3 and pos != start:
+            break
+        instructions.append((pos, opcode, params))
+        pos += 1 + len(params)
+        if opcode in TERMINATORS:
+            break
+
+    if len(instructions) == 0:
+        return None
+
+    cells = [reg for reg in range(start, pos) if reg not in volatile]
+    key = (start, size, tuple(registers[reg] if reg not in volatile else None for reg in range(start, pos)))
+    block = _block_cache.get(key)
+    if block is None:
+        block = _build_function(instructions, size, pos)
+        # Blocks which loop back to themselves may be able to run their whole loop at once
+        loop = find_counted_loop(instructions)
+        if loop is not None:
+            block = loop.wrap(block)
+        # The number of instructions in a single pass through the block, which the computer counts towards checkpoints
+        block.instructions = len(instructions)
+        _block_cache.put(key, block)
+    return block, cells
+
+
+#
+
+
+def _build_function(instructions: List[Tuple[int, int, List[Tuple[Optional[int], int, int]]]], size: int, end: int) -> Callable:
+    lines = ["def block(comp, mem, memory, size, writable, base, code):"]
+    terminated = False
+    for pos, opcode, params in instructions:
+        next_pos = pos + 1 + len(params)
+        lines.append("    # %d: %s" % (pos, get_op(opcode).__name__))
+        if opcode == 99:
+            lines.append("    return %d, base, HALT" % pos)
+            terminated = True
+        elif opcode == 3:
+            lines.extend([
+                "    comp.pos = %d" % pos,
+                "    comp.relative_base = base",
+                "    v = comp.request_input()"
+            ])
+            lines.extend(_target(params[0]))
+            lines.extend([
+                "    comp.set_register(t, v)",
+                "    return %d, base, RELOAD" % next_pos
+            ])
+            terminated = True
+        elif opcode == 4:
+            x = _read(params[0], "x", size, lines)
+            lines.append("    return %d, base, %s" % (next_pos, x))
+            terminated = True
+        elif opcode == 5 or opcode == 6:
+            x = _read(params[0], "x", size, lines)
+            y = _read(params[1], "y", size, lines)
+            lines.extend([
+                "    if %s %s 0:" % (x, "!=" if opcode == 5 else "=="),
+                "        return %s, base, None" % y,
+                "    return %d, base, None" % next_pos
+            ])
+            terminated = True
+        elif opcode == 9:
+            x = _read(params[0], "x", size, lines)
+            lines.append("    base += %s" % x)
+        else:
+            x = _read(params[0], "x", size, lines)
+            y = _read(params[1], "y", size, lines)
+            if opcode == 1:
+                lines.append("    v = %s + %s" % (x, y))
+            elif opcode == 2:
+                lines.append("    v = %s * %s" % (x, y))
+            elif opcode == 7:
+                lines.append("    v = 1 if %s < %s else 0" % (x, y))
+            else:
+                lines.append("    v = 1 if %s == %s else 0" % (x, y))
+            lines.extend(_write(params[2], next_pos, may_overflow=opcode == 1 or opcode == 2))
+
+    if not terminated:
+        lines.append("    return %d, base, None" % end)
+
+    namespace = {"HALT": HALT, "RELOAD": RELOAD, "invalid_register": _invalid_register}
+    exec(compile("\n".join(lines), "<intcode block %d>" % instructions[0][0], "exec"), namespace)
+    return namespace["block"]
+
+
+def _read(param: Tuple[Optional[int], int, int], name: str, size: int, lines: List[str]) -> str:
+    """
+    Produces an expression for the value of the given parameter, adding any statements needed to compute it to
+    the given lines.
+    """
+    val, mode, reg = param
+    if val is None:
+        # Volatile parameters are read from the instruction itself at run time
+        if mode == 1:
+            return "mem[%d]" % reg
+        lines.append("    %s = %smem[%d]" % (name, "base + " if mode == 2 else "", reg))
+    elif mode == 1:
+        return str(val)
+    elif mode == 0:
+        # The buffer only ever grows, so registers within it at compile time always will be
+        return "mem[%d]" % val if val < size else "memory.get(%d)" % val
+    else:
+        lines.append("    %s = base + %d" % (name, val))
+    lines.extend([
+        "    if %s < 0:" % name,
+        "        invalid_register(%s)" % name,
+        "    %s = mem[%s] if %s < size else memory.get(%s)" % (name, name, name, name)
+    ])
+    return name
+
+
+def _target(param: Tuple[Optional[int], int, int]) -> List[str]:
+    """
+    Produces the statements storing the register referred to by the given written parameter in the variable t.
+    """
+    val, mode, reg = param
+    if val is None:
+        lines = ["    t = %smem[%d]" % ("base + " if mode == 2 else "", reg)]
+    elif mode == 0:
+        return ["    t = %d" % val]
+    else:
+        lines = ["    t = base + %d" % val]
+    lines.extend([
+        "    if t < 0:",
+        "        invalid_register(t)"
+    ])
+    return lines
+
+
+def _write(param: Tuple[Optional[int], int, int], next_pos: int, may_overflow: bool) -> List[str]:
+    """
+    Produces the statements writing the variable v to the register referred to by the given parameter.  Leaves
+    the block if that register held compiled or decoded code or is being watched, or if the write went through the
+    Memory object rather than directly into its buffer, since that may have copied, grown or replaced the buffer.  The
+    caller reloads the buffer in either case, as watch callbacks may snapshot or fork the computer, sharing it.
+    """
+    lines = _target(param)
+    lines.extend([
+        "    if t >= writable:",
+        "        comp.set_register(t, v)",
+        "        return %d, base, RELOAD" % next_pos
+    ])
+    if may_overflow:
+        lines.extend([
+            "    try:",
+            "        mem[t] = v",
+            "    except OverflowError:",
+            "        comp.set_register(t, v)",
+            "        return %d, base, RELOAD" % next_pos
+        ])
+    else:
+        lines.append("    mem[t] = v")
+    lines.extend([
+        "    if t in code:",
+        "        comp.handle_write(t)",
+        "        return %d, base, RELOAD" % next_pos
+    ])
+    return lines
+
+
+def _invalid_register(reg: int):
+    raise Exception("Invalid register position: %d" % reg)
@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+from typing import List, Optional, Union
+from array import array
+import hashlib
+import mmap
+import os
+import struct
+import sys
+
+from shared.IntcodeCheckpoint import write_values, read_values
+
+
+# Parsed programs are cached in a file alongside their source, with this appended to its name
+IMAGE_SUFFIX = ".intimg"
+
+# Image files begin with this, followed by a version number, the byte order the integers are stored in, and the
+# SHA-256 hash of the source they were parsed from
+MAGIC = b"INTIMG\0\0"
+VERSION = 1
+HEADER = "<Ic32s"
+
+
+def parse_program(s: str) -> Union[array, List[int]]:
+    """
+    Parses comma-separated Intcode into an array of 64-bit integers, or a list if any value is too large for 64 bits.
+    """
+    values = list(map(int, s.split(",")))
+    try:
+        return array("q", values)
+    except OverflowError:
+        return values
+
+
+def load_program(path: str, cache: bool = True) -> Union[array, List[int]]:
+    """
+    Loads the Intcode program in the given file.  The parsed program is cached as a binary image next to the file,
+    keyed by the hash of the file's contents, and is read back from the image (via mmap) whenever the file hasn't
+    changed since.
+
+    @param cache: If False, always parses the file, without reading or writing an image
+    """
+    with open(path, "rb") as f:
+        source = f.read()
+    if not cache:
+        return parse_program(source.decode())
+
+    digest = hashlib.sha256(source).digest()
+    image_path = path + IMAGE_SUFFIX
+    values = _read_image(image_path, digest)
+    if values is None:
+        values = parse_program(source.decode())
+        _write_image(image_path, digest, values)
+    return values
+
+
+#
+
+
+def _read_image(path: str, digest: bytes) -> Optional[Union[array, List[int]]]:
+    """
+    Reads the program from an image, or returns None if there is no image of the source with the given hash.
+    """
+    try:
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as image:
+            if image.read(len(MAGIC)) != MAGIC:
+                return None
+            version, byteorder, image_digest = struct.unpack(HEADER, image.read(struct.calcsize(HEADER)))
+            if version != VERSION or image_digest != digest:
+                return None
+            values = read_values(image, swap=byteorder != sys.byteorder[0].encode())
+            if image.tell() != len(image):
+                return None
+            return values
+    except (OSError, ValueError, EOFError, struct.error):
+        # Missing, empty, truncated or corrupt images are simply rebuilt
+        return None
+
+
+def _write_image(path: str, digest: bytes, values: Union[array, List[int]]):
+    """
+    Writes the program to an image.  The image is written alongside the destination under a name unique to this
+    process and then moved into place, so loads running at the same time never see a partial image.
+    """
+    temp_path = "%s.%d.tmp" % (path, os.getpid())
+    try:
+        with open(temp_path, "wb") as f:
+            f.write(MAGIC)
+            f.write(struct.pack(HEADER, VERSION, sys.byteorder[0].encode(), digest))
+            write_values(f, values)
+        os.replace(temp_path, path)
+    except OSError:
+        # Caching is only an optimisation, so carry on without it where the image can't be written
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
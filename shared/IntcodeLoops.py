@@ -0,0 +1,201 @@
+from __future__ import annotations
+
+from typing import Tuple, List, Optional, Callable
+
+
+# A decoded parameter, as (value, mode, register) (see shared.IntcodeCompiler.decode())
+Param = Tuple[Optional[int], int, int]
+
+
+class CountedLoop:
+    """
+    A loop consisting of a single basic block, which adds loop-invariant amounts to some registers, compares one of
+    them against a loop-invariant bound, and jumps back to its start depending on the result.  Such a loop can be
+    run in closed form: the number of iterations it will make is calculated, and every update it would make applied
+    at once.
+
+    The relative base can't change within the loop, so relative-mode registers refer to the same registers on every
+    iteration.
+    """
+
+    def __init__(self, start: int, end: int, updates: List[Tuple[Param, Param]], less_than: bool,
+                 compared: Tuple[Param, Param], flag: Param, jump_if_true: bool):
+        """
+        @param start: The position of the first instruction of the loop
+        @param end: The position following the loop's jump, where execution continues once it exits
+        @param updates: The (register, amount) parameters of each Add instruction in the loop
+        @param less_than: True if the loop's condition uses LessThan, False if it uses Equals
+        @param compared: The two parameters of the comparison
+        @param flag: The parameter the comparison is written to, and which the jump tests
+        @param jump_if_true: True if the jump is JumpIfTrue, False if it is JumpIfFalse
+        """
+        self.start = start
+        self.end = end
+        self.updates = updates
+        self.less_than = less_than
+        self.compared = compared
+        self.flag = flag
+        self.jump_if_true = jump_if_true
+
+    def wrap(self, body: Callable) -> Callable:
+        """
+        Wraps the compiled block for the loop's body, so that the loop is run in closed form wherever possible, and
+        otherwise by running the body as normal.
+        """
+        from shared.IntcodeCompiler import RELOAD
+
+        def block(comp, mem, memory, size, writable, base, code):
+            if self.run(comp, base):
+                return self.end, base, RELOAD
+            return body(comp, mem, memory, size, writable, base, code)
+        return block
+
+    def run(self, comp, base: int) -> bool:
+        """
+        Runs the loop to completion in the given computer, starting at the loop's first instruction with the given
+        relative base.  Does nothing and returns False if it can't be run in closed form from the computer's current
+        state: if it would never exit, or if the registers it refers to overlap in a way that would invalidate the
+        analysis.
+        """
+        targets = [_address(param, base) for param, _ in self.updates]
+        flag = _address(self.flag, base)
+        written = targets + [flag]
+        if min(written) < 0 or len(set(written)) != len(written):
+            return False
+        # The loop mustn't modify its own instructions, or the amounts it adds
+        if any(self.start <= reg < self.end for reg in written):
+            return False
+        # Watched registers must be notified of every write, so the loop has to run one iteration at a time
+        if any(reg in comp._watches for reg in written):
+            return False
+        amounts = []
+        for _, amount in self.updates:
+            reg = _address(amount, base)
+            if reg is not None and (reg < 0 or reg in written):
+                return False
+            amounts.append(amount[0] if reg is None else comp.get_register(reg))
+
+        # Each compared value, after i iterations, is its initial value plus i times a fixed step
+        initial = {reg: comp.get_register(reg) for reg in targets}
+        steps = dict(zip(targets, amounts))
+        terms = []
+        for param in self.compared:
+            reg = _address(param, base)
+            if reg is None:
+                terms.append((param[0], 0))
+            elif reg < 0 or reg == flag:
+                return False
+            elif reg in steps:
+                terms.append((initial[reg], steps[reg]))
+            else:
+                terms.append((comp.get_register(reg), 0))
+
+        # Express the comparison as one of (difference < 0) or (difference == 0), with the difference after i
+        # iterations being difference + i * step
+        difference = terms[0][0] - terms[1][0]
+        step = terms[0][1] - terms[1][1]
+        iterations = _exit_iteration(self.less_than, self.jump_if_true, difference, step)
+        if iterations is None:
+            return False
+
+        for reg in targets:
+            comp.set_register(reg, initial[reg] + iterations * steps[reg])
+        # The loop exits when its condition fails, so the flag holds the opposite of what the jump was waiting for
+        comp.set_register(flag, 0 if self.jump_if_true else 1)
+        return True
+
+
+def find_counted_loop(instructions: List[Tuple[int, int, List[Param]]]) -> Optional[CountedLoop]:
+    """
+    Checks whether the given decoded block (see shared.IntcodeCompiler.compile_block()) is a counted loop, returning
+    it if so.
+    """
+    if len(instructions) < 3:
+        return None
+    start = instructions[0][0]
+    *body, (_, compare_op, compare_params), (jump_pos, jump_op, jump_params) = instructions
+    if compare_op not in (7, 8) or jump_op not in (5, 6):
+        return None
+    # The jump must test the comparison's result, and go back to the start of the loop
+    flag = compare_params[2]
+    if _key(jump_params[0]) != _key(flag) or jump_params[1][1] != 1 or jump_params[1][0] != start:
+        return None
+
+    updates = []
+    for pos, opcode, params in body:
+        if opcode != 1:
+            return None
+        target = params[2]
+        if _key(params[0]) == _key(target):
+            amount = params[1]
+        elif _key(params[1]) == _key(target):
+            amount = params[0]
+        else:
+            return None
+        updates.append((target, amount))
+    if len(updates) == 0:
+        return None
+
+    # Parameters read from memory at run time (because the program overwrites them) can't be analysed
+    params = [p for _, _, ps in instructions for p in ps]
+    if any(p[0] is None for p in params):
+        return None
+    # The same register written twice can't be told apart from a non-affine update
+    written = [_key(target) for target, _ in updates] + [_key(flag)]
+    if len(set(written)) != len(written):
+        return None
+    if any(_key(amount) in written for _, amount in updates):
+        return None
+    if any(_key(p) == _key(flag) for p in compare_params[:2]):
+        return None
+
+    end = jump_pos + 1 + len(jump_params)
+    return CountedLoop(start, end, updates, compare_op == 7, (compare_params[0], compare_params[1]), flag,
+                       jump_op == 5)
+
+
+#
+
+
+def _key(param: Param) -> Tuple[Optional[int], int]:
+    return param[0], param[1]
+
+
+def _address(param: Param, base: int) -> Optional[int]:
+    """
+    Gets the register referred to by the parameter, or None if it is in immediate mode.
+    """
+    val, mode, _ = param
+    if mode == 1:
+        return None
+    return base + val if mode == 2 else val
+
+
+def _exit_iteration(less_than: bool, jump_if_true: bool, difference: int, step: int) -> Optional[int]:
+    """
+    Finds the iteration on which a loop exits, given that after i iterations its condition is
+    (difference + i * step < 0) or (difference + i * step == 0), and that the loop continues while the condition is
+    true if jump_if_true, or while it is false otherwise.  Returns None if the loop never exits.
+    """
+    first = difference + step
+    if less_than:
+        if jump_if_true:
+            # Exits once the difference is no longer negative
+            if first >= 0:
+                return 1
+            return -(difference // step) if step > 0 else None
+        # Exits once the difference becomes negative
+        if first < 0:
+            return 1
+        return (difference - step) // -step if step < 0 else None
+    if jump_if_true:
+        # Exits once the difference is no longer zero
+        if first != 0:
+            return 1
+        return 2 if step != 0 else None
+    # Exits once the difference becomes zero
+    if step == 0:
+        return 1 if first == 0 else None
+    if -difference % step == 0 and -difference // step >= 1:
+        return -difference // step
+    return None
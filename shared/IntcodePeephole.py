@@ -0,0 +1,141 @@
+from __future__ import annotations
+
+from typing import Optional
+from abc import abstractmethod
+
+from shared.Intcode import Computer, Memory, Op, Add, LessThan, Equals, JumpIfTrue, BaseOffset
+
+
+def fuse(registers: Memory, pos: int, op: Op) -> Op:
+    """
+    Looks for an idiom beginning with the given Op, decoded at the given position, and if one is found returns a
+    superinstruction executing the whole idiom in a single dispatch.  Otherwise returns the Op unchanged.
+
+    The superinstruction covers the registers of every instruction in it, so once it has been decoded any write to
+    them discards it, and the original instructions are decoded in its place.
+    """
+    if not isinstance(op, (LessThan, Equals, Add, BaseOffset)):
+        return op
+    next_pos = pos + 1 + op.param_count()
+    if next_pos >= registers.end:
+        return op
+    # Check the following opcode before decoding it, since most instructions don't begin an idiom
+    if registers[next_pos] % 100 not in ((5, 6) if not isinstance(op, BaseOffset) else (1, 2, 5, 6, 7, 8)):
+        return op
+    try:
+        next_op = Op.parse_at(registers, next_pos)
+    except Exception:
+        # Invalid instructions are left to raise their errors once they are executed on their own
+        return op
+
+    if isinstance(op, BaseOffset):
+        return OffsetPrefix(op, fuse(registers, next_pos, next_op))
+    if isinstance(op, (LessThan, Equals)) and _same_register(op.params[2], next_op.params[0]):
+        return CompareJump(op, next_op)
+    if isinstance(op, Add) and (op.params[0][1] == 1 or op.params[1][1] == 1):
+        return AddJump(op, next_op)
+    return op
+
+
+def _same_register(written: tuple, read: tuple) -> bool:
+    # Both position mode, or both relative mode (with the relative base unchanged between them)
+    return written == read and written[1] in (0, 2)
+
+
+#
+
+
+class Superinstruction(Op):
+    """
+    Two adjacent instructions, fused into one Op.  Reports the opcode of its first instruction.
+    """
+
+    def __init__(self, first: Op, second: Op):
+        self.code = first.code
+        self.params = first.params + second.params
+        self.first = first
+        self.second = second
+        self.length = 2 + first.param_count() + second.param_count()
+
+    # Overrides the static method, since the number of parameters depends on the instructions fused
+    def param_count(self):
+        return self.length - 1
+
+    def overwrites(self, reg: int, state: Computer) -> bool:
+        """
+        Checks whether writing to the given register from within this superinstruction would modify its own
+        instructions, in which case the rest of them must be decoded again before executing.
+        """
+        return state.pos <= reg < state.pos + self.length
+
+    @abstractmethod
+    def execute(self, state: Computer) -> Optional[int]:
+        pass
+
+
+#
+
+
+class CompareJump(Superinstruction):
+    """
+    LessThan or Equals, followed by JumpIfTrue or JumpIfFalse on the register that was compared into.
+    """
+
+    def __init__(self, compare: Op, jump: Op):
+        super(CompareJump, self).__init__(compare, jump)
+        self.less_than = isinstance(compare, LessThan)
+        self.jump_if_true = isinstance(jump, JumpIfTrue)
+
+    def execute(self, state: Computer) -> Optional[int]:
+        compare, jump = self.first, self.second
+        x, y = compare.param_val(0, state), compare.param_val(1, state)
+        val = 1 if (x < y if self.less_than else x == y) else 0
+        reg = compare.param_register(2, state)
+        state.set_register(reg, val)
+        if self.overwrites(reg, state):
+            return 4
+        # The jump's condition is the value just compared, so doesn't need reading back from memory
+        if (val != 0) == self.jump_if_true:
+            return jump.param_val(1, state) - state.pos
+        return 7
+
+
+#
+
+
+class AddJump(Superinstruction):
+    """
+    Add with an immediate operand (as used to step loop counters), followed by JumpIfTrue or JumpIfFalse.
+    """
+
+    def __init__(self, add: Op, jump: Op):
+        super(AddJump, self).__init__(add, jump)
+        self.jump_if_true = isinstance(jump, JumpIfTrue)
+
+    def execute(self, state: Computer) -> Optional[int]:
+        add, jump = self.first, self.second
+        reg = add.param_register(2, state)
+        state.set_register(reg, add.param_val(0, state) + add.param_val(1, state))
+        if self.overwrites(reg, state):
+            return 4
+        if (jump.param_val(0, state) != 0) == self.jump_if_true:
+            return jump.param_val(1, state) - state.pos
+        return 7
+
+
+#
+
+
+class OffsetPrefix(Superinstruction):
+    """
+    BaseOffset, followed by an Add, Mult, LessThan, Equals, jump, or another idiom (typically storing into or
+    comparing a register relative to the new base).
+    """
+
+    def execute(self, state: Computer) -> Optional[int]:
+        state.relative_base += self.first.param_val(0, state)
+        # Execute the rest from its own position, as jumps are relative to it
+        state.pos += 2
+        shift = self.second.execute(state)
+        state.pos -= 2
+        return shift + 2
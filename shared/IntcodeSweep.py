@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+from typing import Tuple, List, Optional, Dict, Iterable, Callable, TypeVar, Sized
+from concurrent.futures import ProcessPoolExecutor, Future, FIRST_COMPLETED, wait
+from itertools import islice
+import math
+import os
+
+from shared.Intcode import Computer
+
+
+P = TypeVar("P")
+R = TypeVar("R")
+
+# The number of parameter sets submitted to a worker at a time, when the size of the space isn't known.  Also the
+# largest chunk used when it is, so that searching for the first match doesn't overshoot it by much.
+DEFAULT_CHUNK_SIZE = 100
+
+# The program loaded in each worker process, which every task forks rather than reloading
+_worker_program: Optional[Computer] = None
+
+
+def sweep(registers: List[int], space: Iterable[P], evaluate: Callable[[Computer, P], R],
+          predicate: Optional[Callable[[R], bool]] = None,
+          first_match_only: bool = False,
+          workers: Optional[int] = None,
+          chunk_size: Optional[int] = None) -> List[Tuple[P, R]]:
+    """
+    Evaluates an Intcode program over a parameter space, spread across a pool of worker processes.
+
+    @param registers: The program to run
+    @param space: The parameters to evaluate the program with.  Consumed lazily, a chunk at a time, so may be
+    larger than would fit in memory.
+    @param evaluate: Called with a fresh fork of the program and one set of parameters, returning the result of
+    running the program with those parameters.  Must be picklable (i.e. defined at the top level of a module).
+    @param predicate: If given, only results for which this returns True are kept.  Must also be picklable.
+    @param first_match_only: If True, stops evaluating as soon as the earliest match in the space is known, and
+    returns only that match.
+    @param workers: The number of worker processes, defaulting to the number of CPUs
+    @param chunk_size: The number of parameter sets submitted to a worker at a time.  Defaults to splitting the
+    space into about four chunks per worker if its size is known (i.e. it is a sequence rather than an iterator), up
+    to DEFAULT_CHUNK_SIZE, and to DEFAULT_CHUNK_SIZE otherwise.
+    @return A list of (parameters, result) tuples for the matching results, in the order their parameters appear
+    in the space, regardless of the order in which they were evaluated.
+    """
+    workers = workers if workers is not None else os.cpu_count() or 1
+    if chunk_size is None:
+        if isinstance(space, Sized):
+            chunk_size = min(max(1, math.ceil(len(space) / (workers * 4))), DEFAULT_CHUNK_SIZE)
+        else:
+            chunk_size = DEFAULT_CHUNK_SIZE
+    chunks = _chunked(space, chunk_size)
+    results: Dict[int, List[Tuple[int, P, R]]] = dict()
+    pending: Dict[Future, int] = dict()
+    # The index of the earliest chunk known to contain a match, past which nothing more needs evaluating
+    stop_chunk = None
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(registers,)) as executor:
+        next_chunk = 0
+        exhausted = False
+        while True:
+            # Keep a couple of chunks queued per worker, without reading the whole space at once
+            while not exhausted and len(pending) < workers * 2 and (stop_chunk is None or next_chunk < stop_chunk):
+                chunk = next(chunks, None)
+                if chunk is None:
+                    exhausted = True
+                    break
+                future = executor.submit(_run_chunk, evaluate, predicate, first_match_only,
+                                         next_chunk * chunk_size, chunk)
+                pending[future] = next_chunk
+                next_chunk += 1
+
+            if len(pending) == 0:
+                break
+
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                chunk_index = pending.pop(future)
+                matches = future.result()
+                results[chunk_index] = matches
+                if first_match_only and len(matches) > 0 and (stop_chunk is None or chunk_index < stop_chunk):
+                    stop_chunk = chunk_index
+                    # Chunks after this one can't contain the earliest match
+                    for other, other_index in list(pending.items()):
+                        if other_index > stop_chunk and other.cancel():
+                            del pending[other]
+
+    ordered = [(params, result) for chunk_index in sorted(results) for _, params, result in results[chunk_index]]
+    return ordered[:1] if first_match_only else ordered
+
+
+#
+
+
+def _chunked(space: Iterable[P], chunk_size: int):
+    iterator = iter(space)
+    while True:
+        chunk = list(islice(iterator, chunk_size))
+        if len(chunk) == 0:
+            return
+        yield chunk
+
+
+def _init_worker(registers: List[int]):
+    global _worker_program
+    _worker_program = Computer(registers)
+
+
+def _run_chunk(evaluate: Callable[[Computer, P], R], predicate: Optional[Callable[[R], bool]],
+               first_match_only: bool, start: int, chunk: List[P]) -> List[Tuple[int, P, R]]:
+    matches = []
+    for offset, params in enumerate(chunk):
+        result = evaluate(_worker_program.fork(), params)
+        if predicate is None or predicate(result):
+            matches.append((start + offset, params, result))
+            if first_match_only:
+                break
+    return matches
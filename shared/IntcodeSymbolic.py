@@ -0,0 +1,223 @@
+from __future__ import annotations
+
+from typing import Tuple, List, Optional, Dict, Iterable, Iterator, Union
+from itertools import product
+
+
+class Polynomial:
+    """
+    A polynomial with integer coefficients over symbolic registers.  Each term is keyed by its monomial: a sorted
+    tuple of the registers multiplied together, with repetitions for powers (so (1, 1, 2) is [1]^2 * [2], and () is
+    the constant term).
+    """
+
+    def __init__(self, terms: Optional[Dict[Tuple[int, ...], int]] = None):
+        self.terms = {monomial: coeff for monomial, coeff in (terms or dict()).items() if coeff != 0}
+
+    @staticmethod
+    def symbol(reg: int) -> Polynomial:
+        return Polynomial({(reg,): 1})
+
+    @staticmethod
+    def constant(val: int) -> Polynomial:
+        return Polynomial({(): val})
+
+    def symbols(self) -> List[int]:
+        return sorted({reg for monomial in self.terms for reg in monomial})
+
+    def degree(self, reg: int) -> int:
+        return max((monomial.count(reg) for monomial in self.terms), default=0)
+
+    def constant_value(self) -> Optional[int]:
+        """
+        Gets the value of this polynomial if it doesn't depend on any symbols, otherwise None.
+        """
+        if any(len(monomial) > 0 for monomial in self.terms):
+            return None
+        return self.terms.get((), 0)
+
+    def substitute(self, values: Dict[int, int]) -> Polynomial:
+        """
+        Replaces the given symbols with values, leaving any others symbolic.
+        """
+        terms = dict()
+        for monomial, coeff in self.terms.items():
+            remaining = []
+            for reg in monomial:
+                if reg in values:
+                    coeff *= values[reg]
+                else:
+                    remaining.append(reg)
+            key = tuple(remaining)
+            terms[key] = terms.get(key, 0) + coeff
+        return Polynomial(terms)
+
+    def __add__(self, other: Union[Polynomial, int]) -> Polynomial:
+        other = _polynomial(other)
+        terms = dict(self.terms)
+        for monomial, coeff in other.terms.items():
+            terms[monomial] = terms.get(monomial, 0) + coeff
+        return Polynomial(terms)
+
+    def __mul__(self, other: Union[Polynomial, int]) -> Polynomial:
+        other = _polynomial(other)
+        terms = dict()
+        for (m1, c1), (m2, c2) in product(self.terms.items(), other.terms.items()):
+            key = tuple(sorted(m1 + m2))
+            terms[key] = terms.get(key, 0) + c1 * c2
+        return Polynomial(terms)
+
+    __radd__ = __add__
+    __rmul__ = __mul__
+
+    def __eq__(self, other):
+        return isinstance(other, Polynomial) and self.terms == other.terms
+
+    def __repr__(self):
+        if len(self.terms) == 0:
+            return "0"
+        return " + ".join("*".join([str(coeff)] * (coeff != 1 or len(monomial) == 0) +
+                                   ["[%d]" % reg for reg in monomial])
+                          for monomial, coeff in sorted(self.terms.items(), key=lambda x: (-len(x[0]), x[0])))
+
+
+def _polynomial(val: Union[Polynomial, int]) -> Polynomial:
+    return val if isinstance(val, Polynomial) else Polynomial.constant(val)
+
+
+# The value of a register whose contents depend on the symbols in a way that can't be tracked, such as one read
+# through a symbolic pointer, or the result of comparing symbolic values
+UNKNOWN = object()
+
+
+#
+
+
+def evaluate(registers: List[int], symbols: Iterable[int], max_steps: int = 1000000) \
+        -> Optional[Dict[int, Union[Polynomial, int, object]]]:
+    """
+    Runs a program with the given registers treated as symbols rather than as their values, tracking the contents of
+    every register as an integer or a Polynomial over the symbols.  Intended for programs whose control flow doesn't
+    depend on their inputs, such as those of Day 2.
+
+    @param registers: The program to run
+    @param symbols: The registers to treat as symbolic
+    @param max_steps: The number of instructions to run before giving up
+    @return The contents of every register written to (or symbolic) once the program halts, with UNKNOWN for
+    registers whose contents can't be tracked.  None if the program's control flow, the registers it writes to, or its
+    instructions themselves depend on the symbols, or if it uses I/O, fails or doesn't halt within max_steps.
+    """
+    memory: Dict[int, Union[Polynomial, int, object]] = {reg: Polynomial.symbol(reg) for reg in symbols}
+    pos = 0
+    base = 0
+
+    def get(reg: int):
+        if reg in memory:
+            return memory[reg]
+        return registers[reg] if reg < len(registers) else 0
+
+    def concrete(val) -> Optional[int]:
+        if type(val) == int:
+            return val
+        return val.constant_value() if isinstance(val, Polynomial) else None
+
+    for _ in range(max_steps):
+        code = concrete(get(pos))
+        if code is None:
+            return None
+        opcode = code % 100
+        if opcode == 99:
+            return memory
+        param_count = {1: 3, 2: 3, 7: 3, 8: 3, 5: 2, 6: 2, 9: 1}.get(opcode)
+        if param_count is None:
+            return None
+
+        # Find the register each parameter refers to (or None for immediate mode), and its value
+        addresses = []
+        values = []
+        for i in range(param_count):
+            mode = code // (10 ** (i + 2)) % 10
+            param = get(pos + 1 + i)
+            if mode == 1:
+                addresses.append(None)
+                values.append(param)
+                continue
+            param = concrete(param)
+            if mode == 2 and param is not None:
+                param += base
+            elif mode != 0:
+                return None
+            if param is not None and param < 0:
+                return None
+            addresses.append(param)
+            values.append(get(param) if param is not None else UNKNOWN)
+
+        if opcode == 5 or opcode == 6:
+            condition, target = concrete(values[0]), concrete(values[1])
+            if condition is None or target is None:
+                return None
+            pos = target if (condition != 0) == (opcode == 5) else pos + 3
+            continue
+        if opcode == 9:
+            offset = concrete(values[0])
+            if offset is None:
+                return None
+            base += offset
+            pos += 2
+            continue
+
+        # Writes to a register that isn't known can't be tracked
+        if addresses[2] is None:
+            return None
+        x, y = values[0], values[1]
+        if x is UNKNOWN or y is UNKNOWN:
+            result = UNKNOWN
+        elif opcode == 1:
+            result = _simplify(_polynomial(x) + y)
+        elif opcode == 2:
+            result = _simplify(_polynomial(x) * y)
+        else:
+            x, y = concrete(x), concrete(y)
+            if x is None or y is None:
+                result = UNKNOWN
+            else:
+                result = int(x < y if opcode == 7 else x == y)
+        memory[addresses[2]] = result
+        pos += 4
+    return None
+
+
+def _simplify(val: Polynomial) -> Union[Polynomial, int]:
+    constant = val.constant_value()
+    return constant if constant is not None else val
+
+
+def solve(polynomial: Polynomial, target: int, domains: Dict[int, Iterable[int]]) -> Iterator[Dict[int, int]]:
+    """
+    Finds the values of the symbols for which the polynomial equals the target.  Every symbol but the last is
+    searched exhaustively, while the last is solved for directly wherever the polynomial is linear in it.
+
+    @param domains: The values each symbol may take, for every symbol in the polynomial
+    @return Each solution, as a map of symbols to values, in the order of itertools.product over the domains
+    """
+    symbols = list(domains)
+    if any(reg not in domains for reg in polynomial.symbols()):
+        raise Exception("No domain given for every symbol in %s" % polynomial)
+    domain_values = [list(domains[reg]) for reg in symbols]
+    last = symbols[-1]
+    for assignment in product(*domain_values[:-1]):
+        values = dict(zip(symbols, assignment))
+        remaining = polynomial.substitute(values)
+        if remaining.degree(last) > 1:
+            candidates = [x for x in domain_values[-1] if remaining.substitute({last: x}).constant_value() == target]
+        else:
+            coeff = remaining.terms.get((last,), 0)
+            rest = remaining.terms.get((), 0)
+            if coeff == 0:
+                candidates = domain_values[-1] if rest == target else []
+            elif (target - rest) % coeff == 0 and (target - rest) // coeff in domain_values[-1]:
+                candidates = [(target - rest) // coeff]
+            else:
+                candidates = []
+        for x in candidates:
+            yield {**values, last: x}
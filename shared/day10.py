@@ -0,0 +1,147 @@
+from __future__ import annotations
+from typing import Iterable, Iterator, List, Dict, Tuple
+from bisect import bisect_left
+from itertools import accumulate
+import math
+
+
+def direction(source: Tuple[int, int], target: Tuple[int, int]) -> Tuple[int, int]:
+    """
+    Gets the direction from the source to the target, as the smallest integer vector pointing that way.  Two
+    asteroids lie on the same line of sight from the source exactly when their directions are equal.
+    """
+    dx = target[0] - source[0]
+    dy = target[1] - source[1]
+    g = math.gcd(dx, dy)
+    return dx // g, dy // g
+
+
+def visible_count(source: Tuple[int, int], asteroids: Iterable[Tuple[int, int]]) -> int:
+    """
+    Counts the asteroids visible from the source: one per distinct direction to the others.
+    """
+    return len({direction(source, asteroid) for asteroid in asteroids if asteroid != source})
+
+
+def visibility_counts(asteroids: Iterable[Tuple[int, int]]) -> Dict[Tuple[int, int], int]:
+    """
+    Counts the asteroids visible from each asteroid, in O(n^2) time with exact integer arithmetic.  Each pair of
+    asteroids is only compared once, since the direction back along a line of sight is the opposite of the direction
+    along it.
+    """
+    asteroids = list(dict.fromkeys(asteroids))
+    directions = [set() for _ in asteroids]
+    for i, (x1, y1) in enumerate(asteroids):
+        seen = directions[i]
+        for j in range(i + 1, len(asteroids)):
+            x2, y2 = asteroids[j]
+            dx = x2 - x1
+            dy = y2 - y1
+            g = math.gcd(dx, dy)
+            dx //= g
+            dy //= g
+            seen.add((dx, dy))
+            directions[j].add((-dx, -dy))
+    return {asteroid: len(seen) for asteroid, seen in zip(asteroids, directions)}
+
+
+def rays(source: Tuple[int, int], asteroids: Iterable[Tuple[int, int]]) -> Dict[Tuple[int, int], List[Tuple[int, int]]]:
+    """
+    Groups the asteroids other than the source by their direction from it (see direction()), with each group ranked
+    by distance from the source, nearest (the only one visible) first.
+    """
+    groups: Dict[Tuple[int, int], List[Tuple[int, Tuple[int, int]]]] = dict()
+    for asteroid in asteroids:
+        if asteroid == source:
+            continue
+        dx = asteroid[0] - source[0]
+        dy = asteroid[1] - source[1]
+        # The asteroid is this many steps of its direction away from the source
+        g = math.gcd(dx, dy)
+        key = (dx // g, dy // g)
+        if key in groups:
+            groups[key].append((g, asteroid))
+        else:
+            groups[key] = [(g, asteroid)]
+    return {key: [asteroid for _, asteroid in sorted(group)] for key, group in groups.items()}
+
+
+def sort_clockwise(directions: Iterable[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    """
+    Sorts directions clockwise, starting from straight up (with y increasing downwards), using exact integer keys so
+    the sort runs without a comparison function.  Directions are first split into the half-plane swept from up to
+    just before down, and the half-plane swept from down to just before up.  Within a half-plane, direction a comes
+    before b exactly when the cross product of a and b is positive, which is the same order as the position of each
+    direction along the diamond |x| + |y| = 1: y / (x + |y|) in the first half-plane (where x >= 0), rising from -1
+    straight up towards 1 straight down, and -y / (-x + |y|) in the second (where x <= 0), rising from -1 straight
+    down towards 1 straight up.  Each position is a fraction with a denominator of at most 2m, where m is the largest
+    component of any direction, so two distinct positions differ by at least 1 / 4m^2, and scaling by 4m^2 and
+    rounding down keeps them distinct (and equal directions equal).
+    """
+    directions = list(directions)
+    largest = max((max(abs(dx), abs(dy)) for dx, dy in directions), default=0)
+    scale = 4 * largest * largest
+
+    def key(direction: Tuple[int, int]) -> Tuple[int, int]:
+        dx, dy = direction
+        if dx > 0 or (dx == 0 and dy < 0):
+            return 0, (dy * scale) // (dx + abs(dy))
+        return 1, (-dy * scale) // (-dx + abs(dy))
+
+    return sorted(directions, key=key)
+
+
+class Laser:
+    """
+    Answers which asteroids a rotating laser vaporizes, and in what order, without simulating it.  The laser starts
+    pointing up and turns clockwise, vaporizing the nearest remaining asteroid in each direction it passes, so on
+    its r'th rotation (counting from 0) it vaporizes the r'th nearest asteroid of every direction with more than r
+    asteroids in it.  For each station, the directions are ranked once, in O(n log n), after which the k'th asteroid
+    vaporized is found in O(log n) by counting how many are vaporized in each rotation.
+    """
+
+    def __init__(self, asteroids: Iterable[Tuple[int, int]]):
+        self.asteroids = list(dict.fromkeys(asteroids))
+        self._stations: Dict[Tuple[int, int], Tuple[List[List[Tuple[int, int]]], List[List[int]], List[int]]] = dict()
+
+    def nth_vaporized(self, source: Tuple[int, int], k: int) -> Tuple[int, int]:
+        """
+        Gets the k'th asteroid vaporized by a laser at the source, counting from 1.
+        """
+        ranked_rays, rotations, totals = self._prepare(source)
+        total = totals[-1] if len(totals) > 0 else 0
+        if not 1 <= k <= total:
+            raise Exception("Only %d asteroids can be vaporized, not %d" % (total, k))
+        # Find the rotation in which the k'th asteroid is vaporized, then its direction among those hit that rotation
+        rotation = bisect_left(totals, k)
+        before = totals[rotation - 1] if rotation > 0 else 0
+        return ranked_rays[rotations[rotation][k - before - 1]][rotation]
+
+    def vaporization_order(self, source: Tuple[int, int]) -> Iterator[Tuple[int, int]]:
+        """
+        Generates every asteroid in the order a laser at the source vaporizes them.
+        """
+        ranked_rays, rotations, _ = self._prepare(source)
+        for rotation, hit in enumerate(rotations):
+            for ray in hit:
+                yield ranked_rays[ray][rotation]
+
+    def _prepare(self, source: Tuple[int, int]) \
+            -> Tuple[List[List[Tuple[int, int]]], List[List[int]], List[int]]:
+        """
+        Gets the rays from the source in clockwise order, the indices of the rays hit in each rotation, and the total
+        number of asteroids vaporized by the end of each rotation.
+        """
+        if source in self._stations:
+            return self._stations[source]
+        groups = rays(source, self.asteroids)
+        ranked_rays = [groups[direction] for direction in sort_clockwise(groups)]
+        rotations = []
+        for i, ray in enumerate(ranked_rays):
+            for rotation in range(len(rotations), len(ray)):
+                rotations.append([])
+            for rotation in range(len(ray)):
+                rotations[rotation].append(i)
+        totals = list(accumulate(len(hit) for hit in rotations))
+        self._stations[source] = ranked_rays, rotations, totals
+        return self._stations[source]
@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+from typing import Tuple, List, Optional, Iterable
+from concurrent.futures import ProcessPoolExecutor
+import os
+
+import numpy as np
+
+
+# The asteroids loaded in each worker process, as an (n x 2) array of coordinates
+_worker_asteroids: Optional[np.ndarray] = None
+
+
+def best_stations(asteroids: Iterable[Tuple[int, int]], k: int = 1, workers: Optional[int] = None,
+                  chunk_size: int = 1024, batch_elements: int = 1 << 21) -> List[Tuple[Tuple[int, int], int]]:
+    """
+    Finds the asteroids from which the most other asteroids are visible, for maps too large to search one pair at a
+    time.  Candidate stations are sharded across a pool of worker processes, and each worker counts the asteroids
+    visible from a batch of candidates at once with NumPy: the vectors to every asteroid are reduced by their gcd
+    and packed into single integers, and the distinct directions in each candidate's row are counted after sorting.
+
+    @param asteroids: The coordinates of every asteroid
+    @param k: The number of stations to return
+    @param workers: The number of worker processes, defaulting to the number of CPUs.  With a single worker, the
+    search runs in this process.
+    @param chunk_size: The number of candidate stations submitted to a worker at a time
+    @param batch_elements: The number of direction keys a worker computes at once, bounding its memory use
+    @return The best k stations, as (coordinates, visible asteroids) tuples, from most to fewest visible.  Ties are
+    ordered as the asteroids were given.
+    """
+    coords = np.array(list(dict.fromkeys(asteroids)), dtype=np.int64).reshape(-1, 2)
+    if len(coords) == 0:
+        return []
+    workers = workers if workers is not None else os.cpu_count() or 1
+    chunks = [(start, min(start + chunk_size, len(coords))) for start in range(0, len(coords), chunk_size)]
+
+    if workers == 1:
+        counts = [count_visible(coords, start, stop, batch_elements) for start, stop in chunks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(coords,)) as executor:
+            counts = list(executor.map(_count_chunk, [(start, stop, batch_elements) for start, stop in chunks]))
+    counts = np.concatenate(counts)
+
+    # Sort by count, keeping ties in their original order
+    best = np.argsort(-counts, kind="stable")[:k]
+    return [((int(coords[i, 0]), int(coords[i, 1])), int(counts[i])) for i in best]
+
+
+def count_visible(coords: np.ndarray, start: int, stop: int, batch_elements: int = 1 << 21) -> np.ndarray:
+    """
+    Counts the asteroids visible from each of coords[start:stop], among all of coords (which must be distinct).
+    """
+    span_x = int(coords[:, 0].max() - coords[:, 0].min())
+    span_y = int(coords[:, 1].max() - coords[:, 1].min())
+    # Reduced directions have components within the spans, so offsetting them makes them non-negative for packing
+    height = 2 * span_y + 1
+    batch = max(1, batch_elements // len(coords))
+    counts = np.empty(stop - start, dtype=np.int64)
+
+    for batch_start in range(start, stop, batch):
+        batch_stop = min(batch_start + batch, stop)
+        dx = coords[np.newaxis, :, 0] - coords[batch_start:batch_stop, np.newaxis, 0]
+        dy = coords[np.newaxis, :, 1] - coords[batch_start:batch_stop, np.newaxis, 1]
+        g = np.gcd(dx, dy)
+        # Each candidate's vector to itself is (0, 0), which stays as a single key of its own
+        g[g == 0] = 1
+        keys = (dx // g + span_x) * height + (dy // g + span_y)
+        keys.sort(axis=1)
+        distinct = 1 + np.count_nonzero(keys[:, 1:] != keys[:, :-1], axis=1)
+        counts[batch_start - start:batch_stop - start] = distinct - 1
+    return counts
+
+
+#
+
+
+def _init_worker(coords: np.ndarray):
+    global _worker_asteroids
+    _worker_asteroids = coords
+
+
+def _count_chunk(args: Tuple[int, int, int]) -> np.ndarray:
+    start, stop, batch_elements = args
+    return count_visible(_worker_asteroids, start, stop, batch_elements)
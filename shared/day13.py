@@ -0,0 +1,466 @@
+from __future__ import annotations
+
+from typing import Tuple, List, Optional, Dict, Callable, Iterable
+from array import array
+import time
+
+from shared.Intcode import Computer, OutputChannel, Watchpoint
+
+
+EMPTY, WALL, BLOCK, PADDLE, BALL = range(5)
+
+
+class Arcade:
+    """
+    Plays the arcade game headlessly, as fast as the computer can run it.  Outputs are consumed as they are produced,
+    a value at a time, without building a list or tuple for each (x, y, tile) triple.  Tiles are drawn into a dense
+    row-major screen, which is sized once the first full frame has been drawn (when the game first asks for joystick
+    input), while the score, the number of blocks left and the positions of the ball and paddle are kept up to date
+    as tiles are drawn.
+    """
+
+    def __init__(self, computer: Computer, joystick: Optional[Callable[[Arcade], int]] = None,
+                 recording: Optional[Recording] = None):
+        """
+        @param computer: The computer running the game, with quarters already inserted if it is to be played
+        @param joystick: Called at every frame to get the joystick position (-1, 0 or 1).  Defaults to following the
+        ball with the paddle.
+        @param recording: If given, the game is recorded into it from its first frame
+        """
+        self.computer = computer
+        self.joystick = joystick if joystick is not None else Arcade.follow_ball
+        self.recording = recording
+        # Called with the arcade once its screen has been sized and drawn, or restored
+        self.on_screen: Optional[Callable[[Arcade], None]] = None
+        # Called with the arcade and the tile's x, y and value each time a tile is drawn once the screen exists
+        self.on_tile: Optional[Callable[[Arcade, int, int, int], None]] = None
+        self.width = 0
+        self.height = 0
+        self.screen: Optional[bytearray] = None
+        self.score = 0
+        self.blocks = 0
+        self.ball_x = 0
+        self.ball_y = 0
+        self.paddle_x = 0
+        self.paddle_y = 0
+        self.tiles = 0
+        self.frames = 0
+        self.elapsed = 0.0
+        # Tiles drawn before the screen's size is known, as consecutive (x, y, tile) values
+        self._first_frame = array("q")
+        self._received = 0
+        self._x = 0
+        self._y = 0
+        self._until_frame: Optional[int] = None
+        computer.outputs = OutputChannel(sink=self._receive)
+        computer.input_method = self._request_joystick
+
+    def run(self, run: Callable[[Computer], object] = Computer.run_compiled, until_frame: Optional[int] = None) -> int:
+        """
+        Runs the game until it ends, returning the final score.
+
+        @param run: The method used to run the computer, e.g. Computer.run_fast
+        @param until_frame: If given, stops the game when it asks for the input of this frame (counting from 0),
+        rather than running it to the end.  The game can be resumed by running it again.
+        """
+        self._until_frame = until_frame
+        start = time.perf_counter()
+        try:
+            run(self.computer)
+        except _FrameReached:
+            pass
+        finally:
+            self.elapsed += time.perf_counter() - start
+        if self.screen is None:
+            self._build_screen()
+        return self.score
+
+    def save_state(self) -> GameState:
+        return GameState(self)
+
+    def fork(self, joystick: Optional[Callable[[Arcade], int]] = None) -> Arcade:
+        """
+        Creates an independent arcade in the same state as this one, with a fork of its computer (see Computer.fork()),
+        which isn't recorded or rendered.
+        """
+        arcade = Arcade(self.computer.fork(), joystick=joystick)
+        arcade.width = self.width
+        arcade.height = self.height
+        arcade.screen = bytearray(self.screen) if self.screen is not None else None
+        arcade.score = self.score
+        arcade.blocks = self.blocks
+        arcade.ball_x = self.ball_x
+        arcade.ball_y = self.ball_y
+        arcade.paddle_x = self.paddle_x
+        arcade.paddle_y = self.paddle_y
+        arcade.tiles = self.tiles
+        arcade.frames = self.frames
+        arcade._first_frame = array("q", self._first_frame)
+        arcade._received = self._received
+        arcade._x = self._x
+        arcade._y = self._y
+        return arcade
+
+    def restore_state(self, state: GameState):
+        """
+        Returns the game to a state saved by save_state(), possibly from another arcade.
+        """
+        self.computer.restore(state.snapshot)
+        # The snapshot passes outputs to the arcade it was saved from, which may not be this one
+        self.computer.outputs = OutputChannel(sink=self._receive)
+        self.width = state.width
+        self.height = state.height
+        self.screen = bytearray(state.screen) if state.screen is not None else None
+        self.score = state.score
+        self.blocks = state.blocks
+        self.ball_x = state.ball_x
+        self.ball_y = state.ball_y
+        self.paddle_x = state.paddle_x
+        self.paddle_y = state.paddle_y
+        self.tiles = state.tiles
+        self.frames = state.frames
+        self._first_frame = array("q")
+        self._received = 0
+        if self.screen is not None and self.on_screen is not None:
+            self.on_screen(self)
+
+    def tile_at(self, x: int, y: int) -> int:
+        return self.screen[y * self.width + x]
+
+    def screen_info(self) -> Dict[Tuple[int, int], int]:
+        """
+        Gets the screen as a map of coordinates to tiles.
+        """
+        return {(x, y): self.screen[y * self.width + x] for y in range(self.height) for x in range(self.width)}
+
+    def tiles_per_second(self) -> float:
+        return self.tiles / self.elapsed if self.elapsed > 0 else 0.0
+
+    def frames_per_second(self) -> float:
+        return self.frames / self.elapsed if self.elapsed > 0 else 0.0
+
+    @staticmethod
+    def follow_ball(arcade: Arcade) -> int:
+        if arcade.paddle_x < arcade.ball_x:
+            return 1
+        elif arcade.paddle_x > arcade.ball_x:
+            return -1
+        return 0
+
+    #
+
+    def _receive(self, val: int):
+        if self._received == 0:
+            self._x = val
+            self._received = 1
+            return
+        if self._received == 1:
+            self._y = val
+            self._received = 2
+            return
+        self._received = 0
+
+        x, y = self._x, self._y
+        if x == -1 and y == 0:
+            self.score = val
+            return
+        self.tiles += 1
+        if val == BALL:
+            self.ball_x = x
+            self.ball_y = y
+        elif val == PADDLE:
+            self.paddle_x = x
+            self.paddle_y = y
+
+        if self.screen is None:
+            self._first_frame.append(x)
+            self._first_frame.append(y)
+            self._first_frame.append(val)
+            return
+        if not (0 <= x < self.width and 0 <= y < self.height):
+            raise Exception("Tile drawn outside of the screen: (%d, %d)" % (x, y))
+        index = y * self.width + x
+        old = self.screen[index]
+        if old == BLOCK:
+            self.blocks -= 1
+        if val == BLOCK:
+            self.blocks += 1
+        self.screen[index] = val
+        if self.on_tile is not None:
+            self.on_tile(self, x, y, val)
+
+    def _request_joystick(self, computer: Computer) -> int:
+        if self.screen is None:
+            self._build_screen()
+        if self.frames == self._until_frame:
+            raise _FrameReached()
+        val = self.joystick(self)
+        if self.recording is not None:
+            self.recording.record(self, val)
+        self.frames += 1
+        return val
+
+    def _build_screen(self):
+        tiles = self._first_frame
+        self.width = max(tiles[0::3], default=-1) + 1
+        self.height = max(tiles[1::3], default=-1) + 1
+        self.screen = bytearray(self.width * self.height)
+        for i in range(0, len(tiles), 3):
+            self.screen[tiles[i + 1] * self.width + tiles[i]] = tiles[i + 2]
+        self.blocks = self.screen.count(BLOCK)
+        self._first_frame = array("q")
+        if self.on_screen is not None:
+            self.on_screen(self)
+
+
+class _FrameReached(Exception):
+    """
+    Raised from an arcade's input method to stop the computer at the frame it was asked to run until.
+    """
+    pass
+
+
+class GameState:
+    """
+    The state of an arcade at a particular moment: its computer's state, sharing memory copy-on-write, along with a
+    copy of its screen and counters.
+    """
+
+    def __init__(self, arcade: Arcade):
+        self.snapshot = arcade.computer.snapshot()
+        self.width = arcade.width
+        self.height = arcade.height
+        self.screen = bytes(arcade.screen) if arcade.screen is not None else None
+        self.score = arcade.score
+        self.blocks = arcade.blocks
+        self.ball_x = arcade.ball_x
+        self.ball_y = arcade.ball_y
+        self.paddle_x = arcade.paddle_x
+        self.paddle_y = arcade.paddle_y
+        self.tiles = arcade.tiles
+        self.frames = arcade.frames
+
+
+class Recording:
+    """
+    A record of a game: the joystick input given at every frame, and the state of the game at the start of every
+    interval'th frame.  Any frame can be recreated with replay() by restoring the last state saved before it, and
+    replaying fewer than interval frames of inputs from there.
+    """
+
+    def __init__(self, interval: int = 100):
+        self.interval = interval
+        self.inputs = array("b")
+        self.states: List[GameState] = []
+
+    def record(self, arcade: Arcade, val: int):
+        """
+        Records the input given at the arcade's current frame, saving its state first if it is due.
+        """
+        frame = arcade.frames
+        if frame != len(self.inputs):
+            raise Exception("Expected frame %d to be recorded, not frame %d" % (len(self.inputs), frame))
+        if frame % self.interval == 0:
+            self.states.append(arcade.save_state())
+        self.inputs.append(val)
+
+    def playback(self, arcade: Arcade) -> int:
+        """
+        A joystick giving the recorded input for the arcade's current frame.
+        """
+        if arcade.frames >= len(self.inputs):
+            raise Exception("No input was recorded for frame %d" % arcade.frames)
+        return self.inputs[arcade.frames]
+
+    def __len__(self) -> int:
+        return len(self.inputs)
+
+
+class Planner:
+    """
+    A joystick which moves the paddle straight to where the ball will next come down to it, rather than chasing the
+    ball, so that the paddle only moves (and the game only spends instructions redrawing it) when it has to.  Where
+    the ball will come down is worked out from its position and velocity by bouncing it around a copy of the screen
+    the way the game does (see bounce()), without running the game any further.  Every state of the ball on its way
+    down is kept along with where it leads, keyed by the ball's position and velocity and the number of blocks left
+    (which, since blocks are only ever removed, identifies the board within a game), so the ball's path only needs
+    working out once each time it leaves the paddle.
+
+    A planner holds the predictions for a single game, so a new one must be used for each game.
+    """
+
+    def __init__(self, max_steps: int = 10000):
+        """
+        @param max_steps: The most moves of the ball to follow when working out where it will come down, beyond which
+        the paddle just follows the ball
+        """
+        self.max_steps = max_steps
+        self.predictions: Dict[Tuple, Optional[int]] = dict()
+        self._previous: Optional[Tuple[int, int]] = None
+
+    def __call__(self, arcade: Arcade) -> int:
+        previous, self._previous = self._previous, (arcade.ball_x, arcade.ball_y)
+        # The ball's velocity isn't known until it has been seen to move
+        if previous is None or abs(arcade.ball_x - previous[0]) != 1 or abs(arcade.ball_y - previous[1]) != 1:
+            return Arcade.follow_ball(arcade)
+        dx, dy = arcade.ball_x - previous[0], arcade.ball_y - previous[1]
+        key = (arcade.ball_x, arcade.ball_y, dx, dy, arcade.blocks)
+        if key in self.predictions:
+            target = self.predictions[key]
+        else:
+            target = self._predict(arcade, dx, dy)
+        if target is None:
+            return Arcade.follow_ball(arcade)
+        if arcade.paddle_x < target:
+            return 1
+        elif arcade.paddle_x > target:
+            return -1
+        return 0
+
+    def _predict(self, arcade: Arcade, dx: int, dy: int) -> Optional[int]:
+        """
+        Finds the x coordinate at which the ball will next be just above the paddle while moving down.  The paddle
+        must be there when that frame's input has been given to hit it.  Returns None if the ball wasn't found to
+        come down within the maximum number of steps.
+        """
+        screen = bytearray(arcade.screen)
+        screen[arcade.paddle_y * arcade.width + arcade.paddle_x] = EMPTY
+        x, y, blocks = arcade.ball_x, arcade.ball_y, arcade.blocks
+        keys = []
+        landing = None
+        for _ in range(self.max_steps):
+            if dy > 0 and y == arcade.paddle_y - 1:
+                landing = x
+                break
+            keys.append((x, y, dx, dy, blocks))
+            x, y, dx, dy, broken = bounce(screen, arcade.width, x, y, dx, dy)
+            blocks -= broken
+            if not (0 <= x < arcade.width and 0 <= y < arcade.paddle_y):
+                break
+        # The ball never returns to a state on its previous path, so only its current path is kept
+        self.predictions = {key: landing for key in keys}
+        return landing
+
+
+def bounce(screen: bytearray, width: int, x: int, y: int, dx: int, dy: int) -> Tuple[int, int, int, int, int]:
+    """
+    Moves the ball one step, as the game does: while it would run into anything other than empty space (or itself)
+    beside it, above or below it, or, failing those, diagonally ahead of it, it is turned back from that side,
+    breaking any block it hit.  Blocks broken are removed from the screen.
+
+    @param screen: The screen, as a dense row-major buffer of tiles (see Arcade)
+    @param width: The width of the screen
+    @return A tuple of the ball's new position and velocity, and the number of blocks it broke
+    """
+    broken = 0
+
+    def hit(hx: int, hy: int) -> bool:
+        nonlocal broken
+        if not (0 <= hx < width and 0 <= hy < len(screen) // width):
+            return False
+        tile = screen[hy * width + hx]
+        if tile == BLOCK:
+            screen[hy * width + hx] = EMPTY
+            broken += 1
+        return tile != EMPTY and tile != BALL
+
+    # A ball wedged into a corner would be turned back forever, so give up on bouncing it after a few turns
+    for _ in range(4):
+        turned = False
+        if hit(x + dx, y):
+            dx = -dx
+            turned = True
+        if hit(x, y + dy):
+            dy = -dy
+            turned = True
+        if not turned and hit(x + dx, y + dy):
+            dx, dy = -dx, -dy
+            turned = True
+        if not turned:
+            break
+    return x + dx, y + dy, dx, dy, broken
+
+
+def replay(recording: Recording, frame: int, run: Callable[[Computer], object] = Computer.run_compiled) -> Arcade:
+    """
+    Recreates a recorded game as it was at the given frame, just before it was given that frame's input, by restoring
+    the last state saved at or before that frame and replaying the recorded inputs from there.  The arcade returned
+    plays the rest of the recorded inputs if it is run on.
+
+    @param run: The method used to run the computer while replaying, e.g. Computer.run_fast
+    """
+    if not 0 <= frame <= len(recording.inputs) or len(recording.states) == 0:
+        raise Exception("Frame %d was not recorded" % frame)
+    arcade = Arcade(Computer([]), joystick=recording.playback)
+    arcade.restore_state(recording.states[min(frame // recording.interval, len(recording.states) - 1)])
+    arcade.run(run, until_frame=frame)
+    return arcade
+
+
+#
+
+
+def find_tile_registers(computer: Computer, tiles: Iterable[int] = (BALL, PADDLE), max_frames: int = 200,
+                        positions: Optional[Dict[int, int]] = None) -> Dict[int, int]:
+    """
+    Finds the registers in which the game keeps the x coordinates of the given tiles (by default the ball and the
+    paddle), by playing a copy of the game and correlating the tiles it draws with its writes to memory.  Every
+    register holding a tile's x coordinate when it is first drawn is watched, and each time the tile is drawn again
+    only those still holding its x coordinate are kept, and of those, if the tile has moved, only those written to
+    since.
+
+    @param computer: The computer running the game, which is left untouched
+    @param max_frames: The number of frames to play before giving up on narrowing the registers down
+    @param positions: The x coordinate each tile was last drawn at, for tiles already drawn by the computer (which
+    may not be drawn again until they move)
+    @return The register holding the x coordinate of each tile
+    """
+    game = computer.fork()
+    game.outputs = []
+    positions = dict(positions) if positions is not None else dict()
+    candidates: Dict[int, Optional[Dict[int, Watchpoint]]] = {tile: None for tile in tiles}
+    frames = 0
+
+    def watch_value(x: int) -> Dict[int, Watchpoint]:
+        return {reg: game.watch(reg) for reg, val in enumerate(game.registers) if val == x}
+
+    for tile, x in positions.items():
+        if tile in candidates:
+            candidates[tile] = watch_value(x)
+
+    def joystick(_: Computer) -> int:
+        nonlocal frames
+        frames += 1
+        # Follow the ball, so that the paddle moves and the game lasts
+        if PADDLE not in positions or BALL not in positions or positions[PADDLE] == positions[BALL]:
+            return 0
+        return 1 if positions[PADDLE] < positions[BALL] else -1
+
+    game.input_method = joystick
+    while frames < max_frames and not all(c is not None and len(c) == 1 for c in candidates.values()):
+        outputs = game.run_until_outputs_compiled(3)
+        if outputs is None:
+            break
+        x, y, tile = outputs
+        if tile not in candidates or (x == -1 and y == 0):
+            continue
+
+        watches = candidates[tile]
+        if watches is None:
+            candidates[tile] = watch_value(x)
+        else:
+            moved = positions[tile] != x
+            for reg, watchpoint in list(watches.items()):
+                if watchpoint.value != x or (moved and watchpoint.writes == 0):
+                    game.unwatch(watchpoint)
+                    del watches[reg]
+                else:
+                    watchpoint.writes = 0
+        positions[tile] = x
+
+    registers = dict()
+    for tile, watches in candidates.items():
+        if watches is None or len(watches) != 1:
+            raise Exception("Could not find the register holding the x coordinate of tile %d" % tile)
+        registers[tile], = watches
+    return registers
@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+from typing import Tuple, List, Dict, Hashable
+import pygame
+import sys
+
+
+class TileRenderer:
+    """
+    Renders a grid of tiles onto a pygame screen.  Each kind of tile is rendered once, as a sprite the size of a grid
+    cell, and drawing a tile just copies its sprite onto an offscreen board.  Lines drawn over the board (such as a
+    laser) only last until the next update, when the board beneath them is restored.  Each update only copies the
+    regions that have changed onto the screen, and only updates those regions of the display.
+
+    Grid coordinates are drawn centered on (x * scale, y * scale).
+    """
+
+    def __init__(self, screen: pygame.Surface, scale: float, sprites: Dict[Hashable, pygame.Surface]):
+        """
+        @param screen: The screen surface to draw on
+        @param scale: The drawing scale
+        @param sprites: The sprite to draw for each kind of tile, as created by make_sprite()
+        """
+        self.screen = screen
+        self.scale = scale
+        self.sprites = sprites
+        self.board = pygame.Surface(screen.get_size())
+        self._dirty: List[pygame.Rect] = []
+        self._lines: List[Tuple[Tuple[int, int], Tuple[int, int], Tuple[int, int, int], int]] = []
+        # Regions drawn over the board at the last update, which must be restored at the next
+        self._overlays: List[pygame.Rect] = []
+
+    def draw_tile(self, coord: Tuple[int, int], tile: Hashable):
+        sprite = self.sprites[tile]
+        size = sprite.get_width()
+        x, y = render_pos(coord, self.scale)
+        self._dirty.append(self.board.blit(sprite, (x - size // 2, y - size // 2)))
+
+    def draw_line(self, start: Tuple[int, int], end: Tuple[int, int], color: Tuple[int, int, int], width: int):
+        """
+        Draws a line between two grid coordinates at the next update, over the tiles, until the update after that.
+        """
+        self._lines.append((render_pos(start, self.scale), render_pos(end, self.scale), color, width))
+
+    def update(self):
+        """
+        Copies every region that has changed since the last update onto the screen, and updates the display there.
+        """
+        rects = self._dirty + self._overlays
+        for rect in rects:
+            self.screen.blit(self.board, rect, rect)
+        self._overlays = [pygame.draw.line(self.screen, color, start, end, width)
+                          for start, end, color, width in self._lines]
+        pygame.display.update(rects + self._overlays)
+        self._dirty = []
+        self._lines = []
+
+    def redraw(self):
+        """
+        Copies the whole board onto the screen, and updates the whole display.
+        """
+        self.screen.blit(self.board, (0, 0))
+        self._overlays = [pygame.draw.line(self.screen, color, start, end, width)
+                          for start, end, color, width in self._lines]
+        pygame.display.flip()
+        self._dirty = []
+        self._lines = []
+
+
+def make_sprite(scale: float, color: Tuple[int, int, int], square_scale: float, width: int = 0) -> pygame.Surface:
+    """
+    Renders a square of the given size and color, centered on a black grid cell of the given scale.
+
+    @param width: The width of the square's outline, or 0 to fill it
+    """
+    size = max(int(scale), 1)
+    sprite = pygame.Surface((size, size))
+    offset = (size - int(square_scale)) // 2
+    pygame.draw.rect(sprite, color, pygame.Rect(offset, offset, int(square_scale), int(square_scale)), width)
+    return sprite
+
+
+def render_pos(coord: Tuple[int, int], scale: float) -> Tuple[int, int]:
+    return int(coord[0] * scale), int(coord[1] * scale)
+
+
+def handle_events(pause_for_clicks: bool):
+    """
+    Processes window events, ending the program if the window is closed.
+
+    @param pause_for_clicks: Whether or not to wait for a mouse click before returning
+    """
+    pause_rendering = True
+    while pause_rendering:
+        for event in pygame.event.get():
+            # End program if window is closed
+            if event.type == pygame.QUIT:
+                sys.exit()
+            # Unpause on click, if pausing for clicks
+            elif event.type == pygame.MOUSEBUTTONDOWN:
+                pause_rendering = False
+        # If not pausing on clicks, just continue
+        if not pause_for_clicks:
+            pause_rendering = False
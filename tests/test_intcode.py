@@ -0,0 +1,132 @@
+from shared.Intcode import Computer
+
+import pytest
+
+
+# Every way of running a program to completion, which must all behave identically
+RUN_MODES = [Computer.run, Computer.run_fast, Computer.run_compiled]
+
+
+@pytest.mark.parametrize("run", RUN_MODES)
+def test_untaken_jump_target_is_not_read(run):
+    # Counts register 100 up to 3, with a JumpIfTrue whose target register (-1) is never read since it never jumps
+    computer = Computer([1001, 100, 1, 100, 5, 102, -1, 1007, 100, 3, 101, 1005, 101, 0, 99])
+    run(computer)
+    assert computer.pos == 14
+    assert computer.get_register(100) == 3
+
+
+@pytest.mark.parametrize("run", RUN_MODES)
+def test_write_into_opcode_of_running_block(run):
+    # Each pass adds 2 to register 101, until the pass itself rewrites that Add (at 16) into a Multiply from its 4th
+    # pass on, once the loop has been compiled
+    computer = Computer([1001, 100, 1, 100, 1007, 100, 4, 102, 1002, 102, -1, 102, 1001, 102, 1002, 16,
+                         1001, 101, 2, 101, 1007, 100, 6, 102, 1005, 102, 0, 99])
+    run(computer)
+    assert computer.pos == 27
+    assert computer.get_register(101) == 48
+
+
+@pytest.mark.parametrize("run", RUN_MODES)
+def test_write_into_parameter_of_running_block(run):
+    # Each pass copies the counter in register 100 into the immediate operand (at 10) of the Add that follows it
+    computer = Computer([1001, 100, 1, 100, 1001, 100, 0, 10, 1001, 101, 0, 101, 1007, 100, 6, 102, 1005, 102, 0,
+                         99])
+    run(computer)
+    assert computer.pos == 19
+    assert computer.get_register(101) == 21
+
+
+@pytest.mark.parametrize("run", RUN_MODES)
+def test_write_into_compiled_block_from_another(run):
+    # The block at 0 adds its immediate operand (at 2) to register 101, which the block at 15 sets to the counter in
+    # register 100 on every pass, including after the block at 0 has been compiled
+    computer = Computer([1001, 101, 1, 101, 1001, 100, 1, 100, 1007, 100, 8, 102, 1006, 102, 22, 1001, 100, 0, 2,
+                         1105, 1, 0, 99])
+    run(computer)
+    assert computer.pos == 22
+    assert computer.get_register(101) == 29
+
+
+@pytest.mark.parametrize("run", RUN_MODES)
+def test_compare_jump_overwriting_its_jump(run):
+    # The LessThan and JumpIfTrue are fused, but the comparison's result (1) is written over the jump's opcode,
+    # leaving an Add of registers 4 and 11 into register 20 to run in its place
+    computer = Computer([1107, 1, 2, 4, 1005, 4, 11, 20, 99, 0, 0, 99])
+    run(computer)
+    assert computer.pos == 8
+    assert computer.get_register(20) == 100
+
+
+@pytest.mark.parametrize("run", RUN_MODES)
+def test_add_jump_overwriting_its_jump(run):
+    # The Add and JumpIfTrue are fused, but the sum is written over the jump's target, moving it from 11 to 9
+    computer = Computer([1101, 0, 9, 6, 1105, 1, 11, 99, 99, 99, 99, 99])
+    run(computer)
+    assert computer.pos == 9
+
+
+# Counted loops (see shared.IntcodeLoops), as the comparison and jump opcodes, and the initial value, step and bound of
+# the register the loop compares
+COUNTED_LOOPS = [
+    (1007, 1005, 0, 1, 10),   # Loops while it's less than the bound
+    (1007, 1006, 20, -3, 5),  # Loops until it's less than the bound
+    (1008, 1005, 4, 1, 5),    # Loops while it's equal to the bound
+    (1008, 1006, 0, 3, 30)    # Loops until it's equal to the bound
+]
+
+
+@pytest.mark.parametrize("compare, jump, initial, step, bound", COUNTED_LOOPS)
+def test_counted_loop(compare, jump, initial, step, bound):
+    # Runs the loop at 4 three times over, setting register 100 to its initial value each time, and counting the
+    # loop's iterations in register 101.  By the third time the loop has been compiled, so runs in closed form.
+    program = [1101, initial, 0, 100,
+               1001, 100, step, 100, 1001, 101, 1, 101, compare, 100, bound, 102, jump, 102, 4,
+               1001, 103, 1, 103, 1007, 103, 3, 104, 1005, 104, 0, 99]
+    expected = Computer(program)
+    expected.run()
+    computer = Computer(program)
+    computer.run_compiled()
+    assert computer.pos == expected.pos == 30
+    for reg in range(100, 105):
+        assert computer.get_register(reg) == expected.get_register(reg)
+
+
+@pytest.mark.parametrize("run", RUN_MODES)
+def test_counted_loop_with_overlapping_targets(run):
+    # With the relative base at 100, the loop at 2 adds both 1 and 2 to register 100, until register 101 reaches 5
+    program = [109, 100, 1001, 100, 1, 100, 21201, 0, 2, 0, 1001, 101, 1, 101, 1007, 101, 5, 102, 1005, 102, 2, 99]
+    computer = Computer(program)
+    run(computer)
+    assert computer.pos == 21
+    assert computer.get_register(100) == 15
+    assert computer.get_register(101) == 5
+
+
+@pytest.mark.parametrize("run", RUN_MODES)
+def test_counted_loop_modifying_itself(run):
+    # The loop at 6 adds 2 to register 101 until it reaches the bound at 16, and 1 to the register at the relative
+    # base.  It is run three times over, the first two (by which time it has been compiled) with the relative base at
+    # 200, and the last with it at 16, so that the loop adds 1 to its own bound.
+    program = [109, 200, 1101, 0, 0, 101,
+               1001, 101, 2, 101, 21201, 0, 1, 0, 1007, 101, 10, 102, 1005, 102, 6,
+               1001, 103, 1, 103, 1008, 103, 2, 104, 1006, 104, 34, 109, -184, 1007, 103, 3, 104, 1005, 104, 2, 99]
+    computer = Computer(program)
+    run(computer)
+    assert computer.pos == 41
+    assert computer.get_register(16) == 20
+    assert computer.get_register(101) == 20
+    assert computer.get_register(200) == 10
+
+
+@pytest.mark.parametrize("run", RUN_MODES)
+def test_counted_loop_with_watched_register(run):
+    # Every write to a watched register is reported, even from loops which could otherwise run in closed form
+    program = [1001, 100, 1, 100, 1007, 100, 10, 101, 1005, 101, 0, 99]
+    computer = Computer(program)
+    values = []
+    watchpoint = computer.watch(100, lambda _, reg, val: values.append(val))
+    run(computer)
+    assert computer.pos == 11
+    assert watchpoint.writes == 10
+    assert values == list(range(1, 11))